@@ -15,6 +15,7 @@ from nodriver.core.config import Config
 from nodriver.core.connection import Connection
 from nodriver.core.connection import ProtocolException
 from nodriver.core.element import Element
+from nodriver.core.pool import BrowserPool
 from nodriver.core.tab import Tab
 from nodriver.core.util import loop, start
 
@@ -28,5 +29,6 @@ __all__ = [
     "util",
     "Element",
     "ContraDict",
-    "ProtocolException"
+    "ProtocolException",
+    "BrowserPool",
 ]
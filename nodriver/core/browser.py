@@ -8,25 +8,34 @@ from __future__ import annotations
 
 import asyncio
 import atexit
+import collections
+import functools
+import ipaddress
 import json
 import logging
 import os
 import pathlib
 import pickle
+import re
+import types
+import urllib.error
 import urllib.parse
-import urllib.request
 import warnings
 from collections import defaultdict
-from typing import List, Tuple, Union
+from typing import Any, AsyncIterator, List, Tuple, Union
 
 from .. import cdp
 from . import tab, util
 from ._contradict import ContraDict
 from .config import Config, PathLike, is_posix
-from .connection import Connection
+from .connection import Connection, PipeTransport
+from .targets import TargetRegistry
 
 logger = logging.getLogger(__name__)
 
+# seconds to wait for a launched browser to accept connections
+STARTUP_TIMEOUT: float = 30
+
 
 class Browser:
     """
@@ -113,8 +122,8 @@ class Browser:
         # weakref.finalize(self, self._quit, self)
         self.config = config
 
-        self.targets: List = []
-        """current targets (all types"""
+        self.targets = TargetRegistry()
+        """current targets (all types), indexed by target id"""
         self.info = None
         self._target = None
         self._process = None
@@ -122,24 +131,35 @@ class Browser:
         self._keep_user_data_dir = None
         self._is_updating = asyncio.Event()
         self.connection: Connection = None
+        self._reaper_task: asyncio.Task = None
+        self._output_task: asyncio.Task = None
         logger.debug("Session object initialized: %s" % vars(self))
 
     @property
     def websocket_url(self):
         return self.info.webSocketDebuggerUrl
 
+    @property
+    def _session_parent(self) -> Union[Connection, None]:
+        """
+        the connection over which targets are attached as flattened sessions,
+        or None when every target uses a websocket of its own
+        """
+        if self.config.flatten_sessions:
+            return self.connection
+        return None
+
     @property
     def main_tab(self) -> tab.Tab:
         """returns the target which was launched with the browser"""
-        return sorted(self.targets, key=lambda x: x.type_ == "page", reverse=True)[0]
+        return self.targets.main_tab
 
     @property
     def tabs(self) -> List[tab.Tab]:
         """returns the current targets which are of type "page"
         :return:
         """
-        tabs = filter(lambda item: item.type_ == "page", self.targets)
-        return list(tabs)
+        return self.targets.tabs
 
     @property
     def cookies(self) -> CookieJar:
@@ -155,25 +175,38 @@ class Browser:
         # return (self._process and self._process.returncode) or False
 
     async def wait(self, time: Union[float, int] = 0.1):
-        """wait for <time> seconds. important to use, especially in between page navigation
+        """wait for <time> seconds. important to use, especially in between page navigation.
+
+        this is a plain timer. the targets are kept up to date by target events,
+        use :py:meth:`refresh_targets` when autodiscover_targets is disabled.
 
         :param time:
         :return:
         """
-        try:
-            await asyncio.wait(
-                [
-                    asyncio.create_task(self.update_targets()),
-                    asyncio.create_task(asyncio.sleep(time)),
-                ],
-                return_when=asyncio.ALL_COMPLETED,
-            )
-        except asyncio.TimeoutError:
-            pass
+        await asyncio.sleep(time)
 
     sleep = wait
     """alias for wait"""
 
+    def events(
+        self,
+        event_type_or_domain: Union[type, types.ModuleType, List[type]],
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        iterate over events of the browser connection (like target events) as they arrive.
+        see :py:meth:`nodriver.Connection.events` for the parameters.
+
+        .. code-block::
+
+            async for event in browser.events(cdp.target.TargetCreated):
+                print(event.target_info.url)
+
+        :param event_type_or_domain: event type(s) or domain module(s) to receive
+        :return: async iterator of events
+        """
+        return self.connection.events(event_type_or_domain, **kwargs)
+
     def _handle_target_update(
         self,
         event: Union[
@@ -188,25 +221,22 @@ class Browser:
         if isinstance(event, cdp.target.TargetInfoChanged):
             target_info = event.target_info
 
-            current_tab = next(
-                filter(
-                    lambda item: item.target_id == target_info.target_id, self.targets
-                )
-            )
-            current_target = current_tab.target
+            current_tab = self.targets.get(target_info.target_id)
+            if current_tab is None:
+                return
 
             if logger.getEffectiveLevel() <= 10:
-                changes = util.compare_target_info(current_target, target_info)
+                changes = util.compare_target_info(current_tab.target, target_info)
                 changes_string = ""
                 for change in changes:
                     key, old, new = change
                     changes_string += f"\n{key}: {old} => {new}\n"
                 logger.debug(
-                    "target #%d has changed: %s"
-                    % (self.targets.index(current_tab), changes_string)
+                    "target %s has changed: %s"
+                    % (target_info.target_id, changes_string)
                 )
 
-                current_tab._target = target_info
+            self.targets.update(target_info)
 
         elif isinstance(event, cdp.target.TargetCreated):
             target_info: cdp.target.TargetInfo = event.target_info
@@ -220,23 +250,27 @@ class Browser:
                 ),
                 target=target_info,
                 browser=self,
+                parent=self._session_parent,
             )
 
-            self.targets.append(new_target)
-
-            logger.debug("target #%d created => %s", len(self.targets), new_target)
+            if self.targets.add(new_target) is new_target:
+                logger.debug("target #%d created => %s", len(self.targets), new_target)
 
         elif isinstance(event, cdp.target.TargetDestroyed):
-            current_tab = next(
-                filter(lambda item: item.target_id == event.target_id, self.targets)
-            )
-            logger.debug(
-                "target removed. id # %d => %s"
-                % (self.targets.index(current_tab), current_tab)
-            )
-            self.targets.remove(current_tab)
-
-        asyncio.create_task(self.update_targets())
+            current_tab = self.targets.discard(event.target_id)
+            if current_tab is None:
+                return
+            logger.debug("target removed => %s", current_tab)
+            # the websocket of the target closes as well, which is not to be reconnected
+            current_tab._closing = True
+            # commands which are in flight will never be answered
+            current_tab._fail_pending("target %s was destroyed" % event.target_id)
+
+        elif isinstance(event, cdp.target.TargetCrashed):
+            current_tab = self.targets.get(event.target_id)
+            if current_tab is not None:
+                # commands which are in flight will never be answered
+                current_tab._fail_pending("target crashed")
 
     async def get(
         self, url="chrome://welcome", new_tab: bool = False, new_window: bool = False
@@ -260,19 +294,16 @@ class Browser:
                 )
             )
             # get the connection matching the new target_id from our inventory
-            connection: tab.Tab = next(
-                filter(
-                    lambda item: item.type_ == "page" and item.target_id == target_id,
-                    self.targets,
-                )
-            )
+            connection: tab.Tab = self.targets.get(target_id)
+            if connection is None:
+                # the TargetCreated event has not been handled yet
+                await self.refresh_targets()
+                connection = self.targets.get(target_id)
             connection._browser = self
 
         else:
             # first tab from browser.tabs
-            connection: tab.Tab = next(
-                filter(lambda item: item.type_ == "page", self.targets)
-            )
+            connection: tab.Tab = self.targets.tabs[0]
             # use the tab to navigate to new url
             frame_id, loader_id, *_ = await connection.send(cdp.page.navigate(url))
             # update the frame_id on the tab
@@ -346,12 +377,10 @@ class Browser:
             )
         )
         await self.sleep(0.5)
-        connection: tab.Tab = next(
-            filter(
-                lambda item: item.type_ == "page" and item.target_id == target_id,
-                self.targets,
-            )
-        )
+        connection: tab.Tab = self.targets.get(target_id)
+        if connection is None:
+            await self.refresh_targets()
+            connection = self.targets.get(target_id)
         return connection
 
     async def start(self=None) -> Browser:
@@ -368,11 +397,28 @@ class Browser:
 
         # self.config.update(kwargs)
         connect_existing = False
+        use_pipe = False
         if self.config.host is not None and self.config.port is not None:
             connect_existing = True
+            if self.config.remote_mode is None:
+                self.config.remote_mode = not _is_loopback(self.config.host)
+                if self.config.remote_mode:
+                    logger.info(
+                        "%s is a remote host, using remote mode", self.config.host
+                    )
+        elif self.config.remote_debugging_pipe and is_posix:
+            # no port at all. targets can only be reached as
+            # flattened sessions over the pipe.
+            use_pipe = True
+            self.config.flatten_sessions = True
         else:
+            if self.config.remote_debugging_pipe:
+                warnings.warn(
+                    "remote_debugging_pipe is not supported on this platform, using a port instead"
+                )
+            # let the browser pick a free port itself, which is read back once it started
             self.config.host = "127.0.0.1"
-            self.config.port = util.free_port()
+            self.config.port = 0
 
         if not connect_existing:
             logger.debug(
@@ -403,11 +449,23 @@ class Browser:
 
         exe = self.config.browser_executable_path
         params = self.config()
+        pipe_kwargs = {}
+        if use_pipe:
+            params.append("--remote-debugging-pipe")
+            child_fds, parent_fds = _create_debugging_pipes()
+            pipe_kwargs = dict(
+                pass_fds=(3, 4),
+                preexec_fn=functools.partial(_dup_debugging_pipes, *child_fds),
+            )
 
         logger.info(
             "starting\n\texecutable :%s\n\narguments:\n%s", exe, "\n\t".join(params)
         )
         if not connect_existing:
+            # a port file left behind by an earlier run would be mistaken for ours
+            (pathlib.Path(self.config.user_data_dir) / "DevToolsActivePort").unlink(
+                missing_ok=True
+            )
             self._process: asyncio.subprocess.Process = (
                 await asyncio.create_subprocess_exec(
                     # self.config.browser_executable_path,
@@ -418,13 +476,32 @@ class Browser:
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE,
                     close_fds=is_posix,
+                    **pipe_kwargs,
                 )
             )
             self._process_pid = self._process.pid
 
-        self._http = HTTPApi((self.config.host, self.config.port))
+        if use_pipe:
+            for fd in child_fds:
+                os.close(fd)
+            util.get_registered_instances().add(self)
+            transport = await PipeTransport.create(*parent_fds)
+            self.connection = Connection(None, browser=self, transport=transport)
+            self._output_task = asyncio.ensure_future(self._drain_output())
+            self.info = await self._get_info()
+            return await self._setup_connection()
+
         util.get_registered_instances().add(self)
-        await asyncio.sleep(0.25)
+        if not connect_existing:
+            websocket_url = await self._wait_for_devtools()
+            self.config.port = urllib.parse.urlsplit(websocket_url).port
+            self._http = HTTPApi((self.config.host, self.config.port))
+            self._output_task = asyncio.ensure_future(self._drain_output())
+            self.connection = Connection(websocket_url, browser=self)
+            self.info = await self._get_info()
+            return await self._setup_connection()
+
+        self._http = HTTPApi((self.config.host, self.config.port))
         for _ in range(5):
             try:
                 self.info = ContraDict(await self._http.get("version"), silent=True)
@@ -449,26 +526,146 @@ class Browser:
             )
 
         self.connection = Connection(self.info.webSocketDebuggerUrl, browser=self)
+        await self._setup_connection()
+
+    async def _wait_for_devtools(self, timeout: float = STARTUP_TIMEOUT) -> str:
+        """
+        waits until the launched browser is ready to be connected to. the browser announces this by
+        printing "DevTools listening on ws://..." to stderr, and by writing the DevToolsActivePort file
+        into the profile directory. whichever is seen first is used.
+
+        :return: the websocket url of the browser
+        """
+        port_file = pathlib.Path(self.config.user_data_dir) / "DevToolsActivePort"
+        stderr = self._process.stderr
+        output = collections.deque(maxlen=20)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        read_line = asyncio.ensure_future(stderr.readline())
+        try:
+            while loop.time() < deadline:
+                # the port file is checked in between, in case nothing is printed
+                done, _ = await asyncio.wait({read_line}, timeout=0.05)
+                if done:
+                    line = read_line.result()
+                    if not line:
+                        break
+                    output.append(line.decode(errors="replace").rstrip())
+                    match = re.search(r"DevTools listening on (ws://\S+)", output[-1])
+                    if match:
+                        return match.group(1)
+                    read_line = asyncio.ensure_future(stderr.readline())
+                    continue
+                if self._process.returncode is not None:
+                    break
+                try:
+                    port, path = port_file.read_text().split()[:2]
+                except (OSError, ValueError):
+                    # not there, or not completely written yet
+                    continue
+                return f"ws://{self.config.host}:{port}{path}"
+        finally:
+            if not read_line.done():
+                read_line.cancel()
+        message = """
+            ---------------------
+            Failed to connect to browser
+            ---------------------
+            One of the causes could be when you are running as root.
+            In that case you need to pass no_sandbox=True 
+            
+            browser output:
+            %s
+            """
+        raise Exception(message % "\n            ".join(output))
+
+    async def _drain_output(self):
+        """
+        reads the output of the browser process, so it never blocks on a full pipe
+        """
+
+        async def drain(stream: asyncio.StreamReader):
+            while True:
+                line = await stream.readline()
+                if not line:
+                    break
+                logger.debug("browser: %s", line.decode(errors="replace").rstrip())
+
+        streams = [self._process.stdout, self._process.stderr]
+        await asyncio.gather(*(drain(stream) for stream in streams if stream))
+
+    async def _get_info(self) -> ContraDict:
+        """
+        fetches the version information of the browser, like /json/version, but over the connection
+        """
+        protocol, product, revision, user_agent, js_version = (
+            await self.connection.send(cdp.browser.get_version())
+        )
+        return ContraDict(
+            {
+                "Browser": product,
+                "Protocol-Version": protocol,
+                "User-Agent": user_agent,
+                "V8-Version": js_version,
+                "WebKit-Version": revision,
+                "webSocketDebuggerUrl": self.connection.websocket_url,
+            },
+            silent=True,
+        )
 
+    async def _setup_connection(self):
+        """
+        sets up target discovery on the (new) browser connection
+        """
         if self.config.autodiscover_targets:
             logger.info("enabling autodiscover targets")
 
-            self.connection.handlers[cdp.target.TargetInfoChanged] = [
-                self._handle_target_update
-            ]
-            self.connection.handlers[cdp.target.TargetCreated] = [
-                self._handle_target_update
-            ]
-            self.connection.handlers[cdp.target.TargetDestroyed] = [
-                self._handle_target_update
-            ]
-            self.connection.handlers[cdp.target.TargetCrashed] = [
-                self._handle_target_update
-            ]
+            self.connection.add_handler(
+                [
+                    cdp.target.TargetInfoChanged,
+                    cdp.target.TargetCreated,
+                    cdp.target.TargetDestroyed,
+                    cdp.target.TargetCrashed,
+                ],
+                self._handle_target_update,
+            )
             await self.connection.send(cdp.target.set_discover_targets(discover=True))
 
-        await self.update_targets()
-        await self
+        self.connection.add_reconnect_hook(self._on_reconnect)
+        if self.config.idle_timeout and self._reaper_task is None:
+            self._reaper_task = asyncio.ensure_future(
+                self._close_idle_connections(self.config.idle_timeout)
+            )
+        await self.refresh_targets()
+
+    async def _close_idle_connections(self, idle_timeout: float):
+        """
+        closes the connections of targets which have been idle for idle_timeout seconds.
+        they connect again on the next command, see :py:attr:`Config.idle_timeout`
+        """
+        while True:
+            await asyncio.sleep(max(idle_timeout / 2, 1))
+            for target in list(self.targets):
+                if (
+                    target is self.connection
+                    or target.closed
+                    or target.has_pending
+                    or target.idle_time < idle_timeout
+                ):
+                    continue
+                logger.debug("closing idle connection to %s", target)
+                try:
+                    await target.disconnect()
+                except (Exception,):
+                    logger.debug("could not close idle connection", exc_info=True)
+
+    async def _on_reconnect(self, connection: Connection):
+        """
+        restores target discovery after the browser connection was reopened
+        """
+        if self.config.autodiscover_targets:
+            await connection.send(cdp.target.set_discover_targets(discover=True))
+        await self.refresh_targets()
 
     async def grant_all_permissions(self):
         """
@@ -568,20 +765,19 @@ class Browser:
         info = await self.connection.send(cdp.target.get_targets(), _is_update=True)
         return info
 
-    async def update_targets(self):
+    async def refresh_targets(self):
+        """
+        fetches the current targets from the browser and updates :py:attr:`targets`.
+
+        with autodiscover_targets enabled (the default) the targets are kept up to date
+        by target events, so this is only needed when autodiscover is disabled.
+        """
         targets: List[cdp.target.TargetInfo]
         targets = await self._get_targets()
-        target_ids = [t.target_id for t in targets]
-        existing_target_ids = [t.target_id for t in self.targets]
         for t in targets:
-            for existing_tab in self.targets:
-                existing_target = existing_tab.target
-                if existing_target.target_id == t.target_id:
-                    existing_tab.target.__dict__.update(t.__dict__)
-                    break
-            else:
-                self.targets.append(
-                    Connection(
+            if self.targets.update(t) is None:
+                self.targets.add(
+                    tab.Tab(
                         (
                             f"ws://{self.config.host}:{self.config.port}"
                             f"/devtools/page"  # all types are 'page' somehow
@@ -589,11 +785,15 @@ class Browser:
                         ),
                         target=t,
                         browser=self,
+                        parent=self._session_parent,
                     )
                 )
 
         await asyncio.sleep(0)
 
+    update_targets = refresh_targets
+    """alias for refresh_targets"""
+
     def __iter__(self):
         self._i = self.tabs.index(self.main_tab)
         return self
@@ -665,6 +865,18 @@ class Browser:
                     del self._i
 
     def stop(self):
+        if self._http is not None:
+            self._http.close()
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        # the websockets close when the browser goes away, which is not to be reconnected
+        for connection in [self.connection, *self.targets]:
+            if connection is None:
+                continue
+            connection._closing = True
+            if connection._bulk is not None:
+                connection._bulk._closing = True
         try:
             # asyncio.get_running_loop().create_task(self.connection.send(cdp.browser.close()))
 
@@ -719,13 +931,57 @@ class Browser:
             self._process_pid = None
 
     def __await__(self):
-        # return ( asyncio.sleep(0)).__await__()
-        return self.update_targets().__await__()
+        if self.config.autodiscover_targets:
+            # targets are kept up to date by events
+            return asyncio.sleep(0).__await__()
+        return self.refresh_targets().__await__()
 
     def __del__(self):
         pass
 
 
+def _is_loopback(host: str) -> bool:
+    """
+    :return: True when host refers to the local machine
+    """
+    if host.lower() in ("localhost", "localhost.localdomain"):
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        # a hostname
+        return False
+
+
+def _create_debugging_pipes() -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """
+    creates the pipes for --remote-debugging-pipe.
+
+    :return: the fds for the browser process (to read from, to write to)
+        and the fds for us (to read from, to write to)
+    """
+    import fcntl
+
+    child_read, parent_write = os.pipe()
+    parent_read, child_write = os.pipe()
+    # chrome expects the pipes at fd 3 and 4. keep the child ends above those,
+    # so they won't get overwritten while being duplicated in the child process.
+    child_fds = []
+    for fd in (child_read, child_write):
+        child_fds.append(fcntl.fcntl(fd, fcntl.F_DUPFD, 5))
+        os.close(fd)
+    return (child_fds[0], child_fds[1]), (parent_read, parent_write)
+
+
+def _dup_debugging_pipes(child_read: int, child_write: int):
+    """
+    runs in the browser process before exec. chrome reads commands
+    from fd 3 and writes responses and events to fd 4
+    """
+    os.dup2(child_read, 3)
+    os.dup2(child_write, 4)
+
+
 class CookieJar:
     def __init__(self, browser: Browser):
         self._browser = browser
@@ -899,9 +1155,25 @@ class CookieJar:
 
 
 class HTTPApi:
-    def __init__(self, addr: Tuple[str, int]):
+    """
+    minimal asyncio http/1.1 client for the devtools http endpoints (/json/...).
+    connections are kept alive and reused, and at most max_connections requests are
+    in flight at the same time, so no threads are involved.
+    """
+
+    def __init__(
+        self, addr: Tuple[str, int], timeout: float = 10, max_connections: int = 4
+    ):
+        """
+        :param addr: (host, port)
+        :param timeout: seconds to wait for a response, after which asyncio.TimeoutError is raised
+        :param max_connections: maximum number of concurrent connections
+        """
         self.host, self.port = addr
         self.api = "http://%s:%d" % (self.host, self.port)
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_connections)
 
     @classmethod
     def from_target(cls, target: "Target"):
@@ -913,26 +1185,110 @@ class HTTPApi:
         return await self._request(endpoint)
 
     async def post(self, endpoint, data):
-        return await self._request(endpoint, data)
+        return await self._request(endpoint, "post", data)
+
+    def close(self):
+        """
+        closes the idle keep-alive connections
+        """
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
 
     async def _request(self, endpoint, method: str = "get", data: dict = None):
-        url = urllib.parse.urljoin(
-            self.api, f"json/{endpoint}" if endpoint else "/json"
-        )
+        path = f"/json/{endpoint}" if endpoint else "/json"
         if data and method.lower() == "get":
             raise ValueError("get requests cannot contain data")
-        if not url:
-            url = self.api + endpoint
-        request = urllib.request.Request(url)
-        request.method = method
-        request.data = None
-        if data:
-            request.data = json.dumps(data).encode("utf-8")
-
-        response = await asyncio.get_running_loop().run_in_executor(
-            None, lambda: urllib.request.urlopen(request, timeout=10)
-        )
-        return json.loads(response.read())
+        body = json.dumps(data).encode("utf-8") if data else b""
+        async with self._slots:
+            status, reason, payload = await asyncio.wait_for(
+                self._round_trip(method.upper(), path, body), self.timeout
+            )
+        if status >= 400:
+            raise urllib.error.HTTPError(self.api + path, status, reason, None, None)
+        try:
+            return json.loads(payload)
+        except ValueError:
+            # some endpoints answer with plain text
+            return payload.decode("utf-8", errors="replace")
+
+    async def _round_trip(
+        self, method: str, path: str, body: bytes
+    ) -> Tuple[int, str, bytes]:
+        request = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Accept: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("latin-1") + body
+        while True:
+            reused = bool(self._idle)
+            if reused:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, reason, payload, keep_alive = await self._read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    # the server closed the idle connection meanwhile, try a new one
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, reason, payload
+
+    @staticmethod
+    async def _read_response(
+        reader: asyncio.StreamReader,
+    ) -> Tuple[int, str, bytes, bool]:
+        """
+        :return: status, reason, body and whether the connection can be used again
+        """
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the browser")
+        version, status, *reason = status_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if not size:
+                    # skip trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            payload = b"".join(chunks)
+        elif "content-length" in headers:
+            payload = await reader.readexactly(int(headers["content-length"]))
+        else:
+            # the body ends when the connection closes
+            payload = await reader.read()
+            keep_alive = False
+        return int(status), " ".join(reason).strip(), payload, keep_alive
 
 
 class BrowserContext:
@@ -63,11 +63,35 @@ class Config:
         :param browser_executable_path: specify browser executable, instead of using autodetect
         :param browser_args: forwarded to browser executable. eg : ["--some-chromeparam=somevalue", "some-other-param=someval"]
         :param sandbox: disables sandbox
-        :param autodiscover_targets: use autodiscovery of targets
+        :param autodiscover_targets: use autodiscovery of targets, which keeps browser.targets up to date using target events.
+            when disabled, use browser.refresh_targets() to update them.
         :param lang: language string to use other than the default "en-US,en;q=0.9"
         :param expert: when set to True, enabled "expert" mode.
                This conveys, the inclusion of parameters:  ----disable-site-isolation-trials,
                as well as some scripts and patching useful for debugging (for example, ensuring shadow-root is always in "open" mode)
+        :param flatten_sessions: when set to True, targets do not open a websocket of their own, but are attached
+               using Target.attachToTarget(flatten=True) and multiplexed over the single browser websocket.
+        :param remote_debugging_pipe: when set to True, the browser is controlled over the --remote-debugging-pipe
+               file descriptors instead of a websocket on a tcp port (posix only). this implies flatten_sessions.
+        :param command_timeout: default number of seconds to wait for the response of a cdp command,
+               after which asyncio.TimeoutError is raised. None (default) waits indefinitely.
+        :param auto_reconnect: when set to True, a connection which is closed unexpectedly is reopened
+               (using exponential backoff, up to reconnect_attempts times). enabled domains and
+               flattened sessions which have handlers are restored.
+        :param reconnect_attempts: number of attempts to reconnect before giving up
+        :param retry_pending: when set to True, commands which were pending while the connection was lost
+               are sent again after reconnecting, using the same ids. by default they fail with a ProtocolException.
+               only use this when your commands are safe to repeat.
+        :param bulk_connection: when set to True, bulk commands which do not depend on the state of the session
+               (screenshots, snapshots, pdf and IO.read) of a target are sent over a second websocket, so their large responses do not delay other
+               responses (like those of input events). has no effect for flattened sessions and pipes.
+        :param idle_timeout: when set, the connection of a target which did not send a command or dispatch an event
+               for this number of seconds, is closed. its handlers are kept, and their domains are enabled again when it
+               reconnects, on the next command. note that a closed connection does not receive events.
+               the browser connection itself is never closed.
+        :param remote_mode: tune the connections for a browser on another host: compressed websockets, larger
+               buffers, no nagle and round trip time measurements (see :py:attr:`Connection.rtt`).
+               by default, it is enabled when connecting to an existing browser on a non-loopback host.
 
         :param kwargs:
 
@@ -108,6 +132,15 @@ class Config:
             self.sandbox = False
 
         self.autodiscover_targets = True
+        self.flatten_sessions = False
+        self.command_timeout = None
+        self.remote_debugging_pipe = False
+        self.auto_reconnect = False
+        self.reconnect_attempts = 5
+        self.retry_pending = False
+        self.bulk_connection = False
+        self.idle_timeout = None
+        self.remote_mode = None
         self.lang = lang
 
         # other keyword args will be accessible by attribute
@@ -195,7 +228,7 @@ class Config:
             args.append("--no-sandbox")
         if self.host:
             args.append("--remote-debugging-host=%s" % self.host)
-        if self.port:
+        if self.port is not None:
             args.append("--remote-debugging-port=%s" % self.port)
         return args
 
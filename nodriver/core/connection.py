@@ -7,32 +7,248 @@
 from __future__ import annotations
 
 import asyncio
+import base64
 import collections
+import enum
+import functools
 import inspect
 import itertools
 import json
 import logging
+import os
+import re
+import socket
+import time
 import types
 from asyncio import iscoroutine, iscoroutinefunction
-from typing import Any, Awaitable, Callable, Generator, List, TypeVar, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import websockets.asyncio.client
 
 from .. import cdp
 from . import browser as _browser
 from . import util
+from .metrics import ConnectionMetrics, MetricsHook
+from .recorder import INCOMING, OUTGOING, Recorder
 
 T = TypeVar("T")
 
 GLOBAL_DELAY = 0.005
 MAX_SIZE: int = 2**28
 PING_TIMEOUT: int = 900  # 15 minutes
+COMMAND_TIMEOUT: Optional[float] = None  # wait indefinitely for responses by default
+RECONNECT_DELAY: float = 0.5  # doubled for every next reconnect attempt
+STREAM_CHUNK_SIZE: int = 2**20  # bytes per IO.read
+# websocket tuning in remote mode
+REMOTE_MAX_QUEUE: int = 1024  # incoming frames buffered before reading pauses
+REMOTE_WRITE_LIMIT: int = 2**20  # bytes buffered before writing waits for the network
+REMOTE_PING_INTERVAL: float = 5.0  # also refreshes the rtt estimate
+
+# queued commands of a higher priority are written to the websocket before
+# queued commands of a lower priority. input events go ahead of everything else,
+# large transfers go last.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_BULK)
+
+# default priority of commands, by method or by domain
+COMMAND_PRIORITIES: Dict[str, int] = {
+    "Input": PRIORITY_HIGH,
+    "Page.captureScreenshot": PRIORITY_BULK,
+    "Page.captureSnapshot": PRIORITY_BULK,
+    "Page.printToPDF": PRIORITY_BULK,
+    "IO.read": PRIORITY_BULK,
+    "Network.getResponseBody": PRIORITY_BULK,
+    "Fetch.getResponseBody": PRIORITY_BULK,
+}
+
+# bulk commands which may be sent over a second websocket to the same target (see
+# Connection.bulk_connection). they must not depend on the state of the session,
+# unlike Network.getResponseBody, which only knows the requests of its own session.
+BULK_CONNECTION_COMMANDS = frozenset(
+    (
+        "Page.captureScreenshot",
+        "Page.captureSnapshot",
+        "Page.printToPDF",
+        "IO.read",
+    )
+)
 
 TargetType = Union[cdp.target.TargetInfo, cdp.target.TargetID]
 
+# domains which send their events without being enabled
+DEFAULT_DOMAINS = (cdp.target, cdp.storage, cdp.input_)
+
+# routing table of raw cdp method names ("Network.responseReceived") to their
+# event classes. it is filled by the @event_class decorators of the cdp package.
+EVENT_TYPES: Dict[str, type] = cdp.util._event_parsers  # noqa
+
+# the id of a response, which chrome puts first
+RESPONSE_ID = re.compile(r'\s*\{\s*"id"\s*:\s*(\d+)')
+
 logger = logging.getLogger(__name__)
 
 
+class Codec:
+    """
+    (de)serializer for the json messages of the cdp transport.
+
+    when `binary` is True, `dumps` returns bytes and `loads` accepts the raw
+    bytes of a frame, so the utf-8 decoding step of the websocket can be skipped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        dumps: Callable[[Any], Union[str, bytes]],
+        loads: Callable[[Union[str, bytes]], Any],
+        binary: bool = False,
+    ):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+        self.binary = binary
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.name}>"
+
+
+def get_codec(name: str = None) -> Codec:
+    """
+    get a codec by name ("orjson", "msgspec" or "json").
+    when no name is given, the fastest available one is returned,
+    falling back to the standard library json module.
+
+    :param name: name of the json library to use
+    :return:
+    :rtype: Codec
+    """
+    for candidate in (name,) if name else ("orjson", "msgspec", "json"):
+        try:
+            if candidate == "orjson":
+                import orjson
+
+                return Codec("orjson", orjson.dumps, orjson.loads, binary=True)
+            if candidate == "msgspec":
+                import msgspec.json
+
+                return Codec(
+                    "msgspec", msgspec.json.encode, msgspec.json.decode, binary=True
+                )
+            if candidate == "json":
+                return Codec(
+                    "json",
+                    functools.partial(json.dumps, separators=(",", ":")),
+                    json.loads,
+                )
+        except ImportError:
+            continue
+    raise ValueError("codec %s is not available" % name)
+
+
+def set_codec(codec: Union[str, Codec]):
+    """
+    sets the default codec for new connections
+
+    :param codec: a Codec instance, or the name of one (see :py:func:`get_codec`)
+    """
+    global CODEC
+    if not isinstance(codec, Codec):
+        codec = get_codec(codec)
+    CODEC = codec
+
+
+CODEC: Codec = get_codec()
+
+
+class PipeTransport:
+    """
+    transport over the pipes of a browser launched with --remote-debugging-pipe.
+    messages are separated by a NUL byte, without any framing overhead.
+
+    it provides the part of the websocket connection interface which is used by :py:class:`Connection`.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self.close_code: Optional[int] = None
+
+    @classmethod
+    async def create(cls, read_fd: int, write_fd: int) -> PipeTransport:
+        """
+        :param read_fd: the fd to read responses and events from
+        :param write_fd: the fd to write commands to
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=MAX_SIZE)
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader),
+            os.fdopen(read_fd, "rb", buffering=0),
+        )
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, os.fdopen(write_fd, "wb", buffering=0)
+        )
+        writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        return cls(reader, writer)
+
+    async def send(self, message: Union[str, bytes], text: bool = None):
+        if self.close_code is not None:
+            raise websockets.exceptions.ConnectionClosedOK(None, None)
+        if isinstance(message, str):
+            message = message.encode()
+        self._writer.write(message + b"\0")
+        await self._writer.drain()
+
+    async def recv(self, decode: bool = None) -> Union[str, bytes]:
+        try:
+            data = await self._reader.readuntil(b"\0")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.close_code = 1000
+            raise websockets.exceptions.ConnectionClosedOK(None, None)
+        data = data[:-1]
+        if decode is False:
+            return data
+        return data.decode()
+
+    async def close(self):
+        if self.close_code is None:
+            self.close_code = 1000
+            self._writer.close()
+
+
+def _frame_size(frame: Union[str, bytes]) -> int:
+    """
+    :return: the size of a frame in bytes, as it goes over the wire
+    """
+    if isinstance(frame, str):
+        return len(frame.encode())
+    return len(frame)
+
+
+def command_priority(method: str) -> int:
+    """
+    :return: the default priority of a command, see :py:data:`COMMAND_PRIORITIES`
+    """
+    priority = COMMAND_PRIORITIES.get(method)
+    if priority is None:
+        priority = COMMAND_PRIORITIES.get(method.partition(".")[0], PRIORITY_NORMAL)
+    return priority
+
+
 class ProtocolException(Exception):
     def __init__(self, *args, **kwargs):  # real signature unknown
 
@@ -77,6 +293,8 @@ class Transaction(asyncio.Future):
     params: dict = None
 
     id: int = None
+    session_id: cdp.target.SessionID = None
+    sent_at: float = None
 
     def __init__(self, cdp_obj: Generator):
         """
@@ -92,8 +310,11 @@ class Transaction(asyncio.Future):
         self.params = params
 
     @property
-    def message(self):
-        return json.dumps({"method": self.method, "params": self.params, "id": self.id})
+    def payload(self) -> dict:
+        payload = {"method": self.method, "params": self.params, "id": self.id}
+        if self.session_id:
+            payload["sessionId"] = self.session_id
+        return payload
 
     @property
     def has_exception(self):
@@ -167,6 +388,331 @@ class EventTransaction(Transaction):
         return fmt
 
 
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+COALESCE = "coalesce"
+QUEUE_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK, COALESCE)
+# events which may wait for room in a full queue with the block policy,
+# before the listener stops reading the connection
+BLOCK_BACKLOG: int = 1000
+
+
+class Subscription:
+    """
+    wraps an event handler which is added with additional options, like a `where` filter
+    or a bounded queue. it compares equal to the handler it wraps, so it can be removed
+    by passing the handler itself.
+
+    when `maxsize` is set, events are buffered in a queue of that size, and a single worker task
+    parses them and calls the handler one at a time (coroutine handlers are awaited).
+    when the queue is full, `policy` decides what happens:
+
+        - drop_oldest: the oldest queued event is dropped
+        - drop_newest: the incoming event is dropped
+        - block: nothing is dropped. incoming events wait (unparsed) until there is room
+          in the queue, and are delivered in order. the listener keeps reading, so responses
+          and the events of other handlers and sessions are not held up, until
+          :py:data:`BLOCK_BACKLOG` events are waiting. then the listener stops reading until
+          there is room again, which is backpressure on the whole connection. a handler which
+          awaits commands must not fall that far behind, since their responses are not read either.
+        - coalesce: a queued event with the same `key` is replaced by the incoming one.
+          when there is no such event, the oldest is dropped.
+
+    `key` is a function of the raw event parameters, or a dotted key path into them.
+    without a key, all events coalesce into the latest one.
+
+    a bounded subscription without handler is consumed by calling :py:meth:`get`,
+    which is what :py:meth:`Connection.events` does.
+    """
+
+    def __init__(
+        self,
+        handler: Union[Callable, Awaitable],
+        where: Union[Callable[[dict], bool], Dict[str, Any]] = None,
+        maxsize: int = None,
+        policy: str = DROP_OLDEST,
+        key: Union[Callable[[dict], Any], str] = None,
+    ):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(
+                "policy must be one of %s, not %s" % (", ".join(QUEUE_POLICIES), policy)
+            )
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.handler = handler
+        self.where = where
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self._predicate = _compile_where(where) if where is not None else None
+        self._key = _compile_key(key)
+        self._buffer = collections.OrderedDict()
+        self._sequence = itertools.count()
+        self._not_empty = asyncio.Event()
+        # events waiting for room in a full queue (block policy)
+        self._parked = collections.deque()
+        self._room = asyncio.Event()
+        self._worker_task = None
+        self._closed = False
+
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        counters of the queue of this subscription
+        """
+        return {
+            "received": self.received,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "queued": len(self._buffer),
+            "waiting": len(self._parked),
+        }
+
+    def matches(self, params: dict) -> bool:
+        """
+        tests the raw event parameters against the `where` filter
+        """
+        if self._predicate is None:
+            return True
+        try:
+            return bool(self._predicate(params))
+        except Exception:  # noqa
+            logger.debug("exception in filter %s", self.where, exc_info=True)
+            return False
+
+    def put(
+        self, event_type: type, params: dict, connection: Connection
+    ) -> Optional[Awaitable]:
+        """
+        queues a raw event for the worker. returns an awaitable when the policy
+        is `block` and the backlog of waiting events is full.
+        """
+        if self._closed:
+            return
+        self.received += 1
+        if self._worker_task is None and self.handler is not None:
+            self._worker_task = asyncio.ensure_future(self._worker())
+        item = (event_type, params, connection)
+        if self.policy == COALESCE:
+            key = ("key", self._key(params) if self._key else None)
+            if key in self._buffer:
+                self._buffer[key] = item
+                self.coalesced += 1
+                return
+        else:
+            key = next(self._sequence)
+        if self._parked or (self.policy == BLOCK and len(self._buffer) >= self.maxsize):
+            # keep the order of the events which are waiting already
+            self._parked.append((key, item))
+            if len(self._parked) >= BLOCK_BACKLOG:
+                return self._wait_for_room()
+            return
+        if len(self._buffer) >= self.maxsize:
+            if self.policy == DROP_NEWEST:
+                self.dropped += 1
+                return
+            self._buffer.popitem(last=False)
+            self.dropped += 1
+        self._buffer[key] = item
+        self._not_empty.set()
+
+    async def _wait_for_room(self):
+        while len(self._parked) >= BLOCK_BACKLOG and not self._closed:
+            self._room.clear()
+            await self._room.wait()
+
+    async def get(self) -> Any:
+        """
+        waits for the next queued event and returns it (parsed)
+        """
+        event, _ = await self._next()
+        self.delivered += 1
+        return event
+
+    async def _next(self) -> Tuple[Any, Connection]:
+        while True:
+            if not self._buffer:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+            _, (event_type, params, connection) = self._buffer.popitem(last=False)
+            if self._parked:
+                key, item = self._parked.popleft()
+                self._buffer[key] = item
+                self._room.set()
+            try:
+                return event_type.from_json(params), connection
+            except Exception as e:  # noqa
+                logger.info(
+                    "%s: %s  during parsing of json from event : %s"
+                    % (type(e).__name__, e.args, params),
+                    exc_info=True,
+                )
+
+    async def _worker(self):
+        while True:
+            event, connection = await self._next()
+            await _call_handler(self.handler, event, connection)
+            self.delivered += 1
+
+    def close(self):
+        """
+        stops the worker and discards queued events
+        """
+        self._closed = True
+        self._buffer.clear()
+        self._parked.clear()
+        self._room.set()
+        if self._worker_task:
+            self._worker_task.cancel()
+            self._worker_task = None
+
+    def __call__(self, *args, **kwargs):
+        return self.handler(*args, **kwargs)
+
+    def __eq__(self, other):
+        if isinstance(other, Subscription):
+            return self is other
+        return self.handler == other
+
+    def __hash__(self):
+        return hash(self.handler)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.handler} where: {self.where} maxsize: {self.maxsize}>"
+
+
+async def _call_handler(callback: Callable, event: Any, connection: Connection):
+    """
+    calls an event handler and awaits it when it's a coroutine function.
+    handlers may accept (event, connection) or just (event).
+    """
+    try:
+        try:
+            result = callback(event, connection)
+        except TypeError:
+            result = callback(event)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.warning(
+            "exception in callback %s for event %s => %s",
+            callback,
+            event.__class__.__name__,
+            e,
+            exc_info=True,
+        )
+
+
+def _compile_key(key: Union[Callable[[dict], Any], str, None]):
+    """
+    turns a coalesce key into a function of the raw event parameters
+    """
+    if key is None or callable(key):
+        return key
+    path = key.split(".")
+
+    def get_key(params: dict):
+        for part in path:
+            params = params.get(part) if isinstance(params, dict) else None
+        return params
+
+    return get_key
+
+
+def _compile_where(
+    where: Union[Callable[[dict], bool], Dict[str, Any]],
+) -> Callable[[dict], bool]:
+    """
+    turns a `where` filter into a predicate on the raw event parameters
+    """
+    if callable(where):
+        return where
+
+    def lookup(params, path):
+        for key in path:
+            params = params[key]
+        return params
+
+    def test(expected, value):
+        if isinstance(expected, re.Pattern):
+            return isinstance(value, str) and expected.search(value) is not None
+        if callable(expected):
+            return expected(value)
+        return expected == value
+
+    conditions = [
+        # cdp enums are matched by their raw (json) value
+        (
+            tuple(key.split(".")),
+            expected.value if isinstance(expected, enum.Enum) else expected,
+        )
+        for key, expected in where.items()
+    ]
+
+    def predicate(params: dict) -> bool:
+        for path, expected in conditions:
+            try:
+                value = lookup(params, path)
+            except (KeyError, TypeError, IndexError):
+                return False
+            if not test(expected, value):
+                return False
+        return True
+
+    return predicate
+
+
+class CommandBatch:
+    """
+    collects commands, which are sent at once using :py:meth:`Connection.send_many`.
+    use it as async context manager, or await it.
+    """
+
+    def __init__(self, connection: Connection, return_exceptions: bool = False):
+        self._connection = connection
+        self._return_exceptions = return_exceptions
+        self.commands: List[Generator[dict[str, Any], dict[str, Any], Any]] = []
+        self.results: List[Any] = None
+
+    def add(self, cdp_obj: Generator[dict[str, Any], dict[str, Any], Any]) -> int:
+        """
+        add a command to the batch
+
+        :param cdp_obj: the generator object created by a cdp method
+        :return: the index of its result in :py:attr:`results`
+        """
+        self.commands.append(cdp_obj)
+        return len(self.commands) - 1
+
+    async def execute(self) -> List[Any]:
+        """
+        sends all commands and waits for the results
+        """
+        commands, self.commands = self.commands, []
+        self.results = await self._connection.send_many(
+            commands, return_exceptions=self._return_exceptions
+        )
+        return self.results
+
+    def __await__(self):
+        return self.execute().__await__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.execute()
+
+
 class CantTouchThis(type):
     def __setattr__(cls, attr, value):
         """
@@ -206,24 +752,102 @@ class Connection(metaclass=CantTouchThis):
         websocket_url: str,
         target: cdp.target.TargetInfo = None,
         browser: _browser.Browser = None,
+        parent: Connection = None,
+        transport: PipeTransport = None,
         **kwargs,
     ):
+        """
+        :param websocket_url: the websocket url of the target
+        :param target: the target info
+        :param browser: the browser instance this connection belongs to
+        :param parent: when given, no websocket of its own is opened. instead, the target is attached
+            to using Target.attachToTarget(flatten=True) and all traffic is routed over the
+            websocket of the parent (browser) connection, by sessionId.
+        :param transport: use this transport instead of opening a websocket to websocket_url
+        """
         super().__init__()
         self.websocket_url: str = websocket_url
         self.mapper = {}
         self.handlers = collections.defaultdict(list)
-        self.enabled_domains = []
+        self.enabled_domains = set()
+        # names of the domains which were enabled by an explicit X.enable command.
+        # they are left alone by the handlers, so their options are kept
+        self._explicit_domains = set()
+        self._domain_refs = collections.Counter()
+        self._handlers_dirty = False
+        self._register_lock = asyncio.Lock()
+        self.session_id: cdp.target.SessionID = None
+        self.sessions: Dict[cdp.target.SessionID, Connection] = {}
         self._target = target
         self._browser = browser
+        self._parent = parent
+        self.codec: Codec = CODEC
+        self.command_timeout: Optional[float] = COMMAND_TIMEOUT
+        self.auto_reconnect: bool = False
+        self.reconnect_attempts: int = 5
+        self.retry_pending: bool = False
+        self.bulk_connection: bool = False
+        self.remote_mode: bool = False
+        if browser is not None:
+            config = browser.config
+            self.command_timeout = getattr(config, "command_timeout", COMMAND_TIMEOUT)
+            self.auto_reconnect = getattr(config, "auto_reconnect", False)
+            self.reconnect_attempts = getattr(config, "reconnect_attempts", 5)
+            self.retry_pending = getattr(config, "retry_pending", False)
+            self.bulk_connection = getattr(config, "bulk_connection", False)
+            self.remote_mode = bool(getattr(config, "remote_mode", False))
+        self._bulk: Optional[Connection] = None
+        self._last_activity = time.monotonic()
+        self._reconnect_hooks: List[Callable[[Connection], Awaitable]] = []
+        self._closing = False
+        # set while reconnecting, see _reconnect()
+        self._reconnected: Optional[asyncio.Event] = None
+        self._connect_lock = asyncio.Lock()
         self._websocket = None
+        self._transport = transport
+        self.metrics: Optional[ConnectionMetrics] = None
+        self.recorder: Optional[Recorder] = None
+        self._lag_monitor_task = None
         self._listener_task = None
+        self._writer_task = None
+        # disables domains in the background, see _count_domain_refs()
+        self._register_task: Optional[asyncio.Task] = None
+        self._send_lanes: Tuple[collections.deque, ...] = None
+        self._send_ready: asyncio.Event = None
         self._event = asyncio.Event()
-        self._lock = asyncio.Lock()
         self.__count__ = itertools.count(0)
         self.__dict__.update(**kwargs)
 
+    @property
+    def flattened(self) -> bool:
+        """
+        True when this connection is a session which is multiplexed over the
+        websocket of the browser connection, instead of using a websocket of its own.
+        """
+        return self._parent is not None
+
+    @property
+    def idle_time(self) -> float:
+        """
+        number of seconds since this connection last sent a command or dispatched an event to a handler
+        """
+        return time.monotonic() - self._last_activity
+
+    @property
+    def has_pending(self) -> bool:
+        """
+        True while commands sent on this connection are awaiting their response
+        """
+        if self._parent is not None:
+            return any(
+                tx.session_id == self.session_id for tx in self._parent.mapper.values()
+            )
+        return bool(self.mapper)
+
     @property
     def closed(self):
+        if self._parent is not None:
+            return not self.session_id or self._parent.closed
         if not self.websocket:
             return True
         return bool(self.websocket.close_code)
@@ -232,7 +856,11 @@ class Connection(metaclass=CantTouchThis):
         self,
         event_type_or_domain: Union[type, types.ModuleType, List[type]],
         handler: Union[Callable, Awaitable],
-    ):
+        where: Union[Callable[[dict], bool], Dict[str, Any]] = None,
+        maxsize: int = None,
+        policy: str = DROP_OLDEST,
+        key: Union[Callable[[dict], Any], str] = None,
+    ) -> Union[Callable, Awaitable, Subscription]:
         """
         add a handler for given event
 
@@ -249,33 +877,62 @@ class Connection(metaclass=CantTouchThis):
 
         the next time you make network traffic you will see your console print like crazy.
 
+        using `where`, events can be filtered on their raw (json) parameters, before the event is parsed
+        and before the handler is scheduled. this is a lot cheaper than filtering inside the handler.
+        it accepts a function which receives the raw params dict and returns a bool, or a dict of
+        (dotted) key paths and the values to match. a value can be a compiled regex, a function, a cdp enum or a plain value.
+        note: the raw parameters use the camelCase names of the protocol.
+
+        .. code-block::
+
+            page.add_handler(
+                cdp.network.ResponseReceived,
+                handler,
+                where={"type": "XHR", "response.url": re.compile(r"/api/")}
+            )
+
         :param event_type_or_domain:
         :type event_type_or_domain:
         :param handler:
         :type handler:
+        by default, sync handlers are called directly by the listener and coroutine handlers are scheduled
+        as tasks, without any limit. for high volume events, pass `maxsize` to give the handler a bounded
+        queue, which is consumed by a single worker, and a `policy` for when it is full:
+        "drop_oldest" (default), "drop_newest", "block" or "coalesce" (by `key`). see :py:class:`Subscription`.
+        dropped events are never parsed. the counters are available in the `stats` of the returned subscription.
 
-        :return:
-        :rtype:
-        """
+        .. code-block::
 
-        if not isinstance(event_type_or_domain, list):
-            event_type_or_domain = [event_type_or_domain]
+            sub = page.add_handler(cdp.page.ScreencastFrame, on_frame, maxsize=1, policy="coalesce")
+            ...
+            print(sub.stats)
 
-        for evt_dom in event_type_or_domain:
-            if isinstance(evt_dom, types.ModuleType):
-                for name, obj in inspect.getmembers_static(evt_dom):
-                    if name.isupper():
-                        continue
-                    if not name[0].isupper():
-                        continue
-                    if type(obj) != type:
-                        continue
-                    if inspect.isbuiltin(obj):
-                        continue
-                    self.handlers[obj].append(handler)
-                return
-            else:
-                self.handlers[evt_dom].append(handler)
+        :param event_type_or_domain:
+        :type event_type_or_domain:
+        :param handler:
+        :type handler:
+        :param where: filter on the raw event parameters
+        :type where: callable | dict
+        :param maxsize: size of the queue of this handler
+        :type maxsize: int
+        :param policy: what to do when the queue is full
+        :type policy: str
+        :param key: coalesce key, a function of the raw event parameters or a dotted key path
+        :type key: callable | str
+
+        :return: the handler, or the :py:class:`Subscription` wrapping it
+        :rtype:
+        """
+        if not isinstance(handler, Subscription) and (
+            where is not None or maxsize is not None
+        ):
+            handler = Subscription(
+                handler, where=where, maxsize=maxsize, policy=policy, key=key
+            )
+        for event_type in self._event_types(event_type_or_domain):
+            self.handlers[event_type].append(handler)
+            self._count_domain_refs(event_type, 1)
+        return handler
 
     def remove_handler(
         self,
@@ -283,40 +940,261 @@ class Connection(metaclass=CantTouchThis):
         handler: Union[Callable, Awaitable] = None,
     ):
         """
-        remove a handler for given event
+        remove a handler for given event.
+        when no handler is given, all handlers for the event are removed.
+
         :param event_type_or_domain:
         :type event_type_or_domain:
         :param handler:
         :type handler:
         """
-        if handler:
-            for event, callbacks in self.handlers.items():
-                for cb in callbacks:
-                    if cb == self:
-                        self.handlers[event].remove(handler)
+        removed = []
+        for event_type in self._event_types(event_type_or_domain):
+            if handler is None:
+                callbacks = self.handlers.pop(event_type, [])
+            else:
+                # a subscription equals the function it wraps, so a subscription is
+                # matched by identity. a function matches its subscriptions as well
+                callbacks, kept = [], []
+                for cb in self.handlers.get(event_type, ()):
+                    if isinstance(handler, Subscription):
+                        match = cb is handler
+                    else:
+                        match = cb == handler
+                    (callbacks if match else kept).append(cb)
+                if kept:
+                    self.handlers[event_type] = kept
+                else:
+                    self.handlers.pop(event_type, None)
+            for callback in callbacks:
+                self._count_domain_refs(event_type, -1)
+            removed.extend(callbacks)
+        for callback in removed:
+            if isinstance(callback, Subscription) and not any(
+                any(cb is callback for cb in callbacks)
+                for callbacks in self.handlers.values()
+            ):
+                # no longer registered for any event
+                callback.close()
+
+    def enable_metrics(
+        self, hooks: List[MetricsHook] = None, lag_interval: Optional[float] = 0.1
+    ) -> ConnectionMetrics:
+        """
+        start collecting traffic statistics: per method call counts and latencies, bytes in and out,
+        in-flight commands, events per type and listener lag. as long as metrics are not enabled,
+        nothing is collected.
+
+        flattened sessions share the websocket of the browser connection, so their
+        traffic is collected by (and enabled on) the browser connection.
+
+        .. code-block::
+
+            metrics = tab.enable_metrics()
+            await tab.get("https://example.com")
+            print(metrics.snapshot()["commands"]["DOM.getDocument"]["p99"])
+
+        :param hooks: functions which are called as hook(kind, name, value) for every measurement,
+            see :py:class:`nodriver.core.metrics.ConnectionMetrics`
+        :param lag_interval: interval (in seconds) at which the event loop lag is sampled. None to disable.
+        :return: the metrics object
+        :rtype: ConnectionMetrics
+        """
+        if self._parent is not None:
+            return self._parent.enable_metrics(hooks, lag_interval)
+        if self.metrics is None:
+            self.metrics = ConnectionMetrics(
+                inflight=lambda: len(self.mapper), hooks=hooks
+            )
+        elif hooks:
+            self.metrics.hooks.extend(hooks)
+        if lag_interval and self._lag_monitor_task is None:
+            self._lag_monitor_task = asyncio.ensure_future(
+                self._monitor_lag(lag_interval)
+            )
+        return self.metrics
+
+    def disable_metrics(self):
+        """
+        stop collecting traffic statistics
+        """
+        if self._parent is not None:
+            return self._parent.disable_metrics()
+        self.metrics = None
+        if self._lag_monitor_task is not None:
+            self._lag_monitor_task.cancel()
+            self._lag_monitor_task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        :return: a snapshot of the collected traffic statistics, or an empty dict when metrics are not enabled
+        """
+        if self._parent is not None:
+            return self._parent.get_metrics()
+        if self.metrics is None:
+            return {}
+        return {**self.metrics.snapshot(), "rtt": self.rtt}
+
+    def start_recording(
+        self, path: Union[str, os.PathLike], level: int = None
+    ) -> Recorder:
+        """
+        start writing all frames sent and received on the websocket to a json lines file,
+        which can be fed back into a connection using :py:class:`nodriver.core.recorder.Replayer`.
+
+        flattened sessions share the websocket of the browser connection, so their
+        traffic is recorded by the browser connection.
+
+        :param path: the file to write. use a .gz, .xz or .lzma suffix to compress it.
+        :param level: compression level, from 0 (fastest) to 9 (smallest). defaults to 1,
+            since the frames are compressed as they are sent and received
+        :return: the recorder
+        :rtype: Recorder
+        """
+        if self._parent is not None:
+            return self._parent.start_recording(path, level)
+        self.stop_recording()
+        self.recorder = Recorder(path, level)
+        return self.recorder
+
+    def stop_recording(self):
+        """
+        stop recording and close the file
+        """
+        if self._parent is not None:
+            return self._parent.stop_recording()
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    async def _monitor_lag(self, interval: float):
+        """
+        samples how late the event loop wakes up this task, which is the time
+        the listener (and anything else on the loop) keeps it busy
+        """
+        loop = asyncio.get_running_loop()
+        while self.metrics is not None:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            metrics = self.metrics
+            if metrics is not None:
+                metrics.loop_lag(max(0.0, loop.time() - expected))
+
+    async def events(
+        self,
+        event_type_or_domain: Union[type, types.ModuleType, List[type]],
+        maxsize: int = 1000,
+        policy: str = DROP_OLDEST,
+        where: Union[Callable[[dict], bool], Dict[str, Any]] = None,
+        key: Union[Callable[[dict], Any], str] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        iterate over events as they arrive. the stream has its own bounded buffer (see :py:meth:`add_handler`
+        for `maxsize`, `policy`, `where` and `key`), and unsubscribes when the iterator is closed.
+
+        .. code-block::
+
+            async for event in tab.events(cdp.network.ResponseReceived, where={"type": "XHR"}):
+                print(event.response.url)
+                if done:
+                    break
+
+        an iterator which is left using `break` is closed when it is garbage collected. use
+        `contextlib.aclosing(tab.events(...))` to unsubscribe at a deterministic moment.
+
+        :param event_type_or_domain: event type(s) or domain module(s) to receive
+        :param maxsize: size of the buffer, at least 1
+        :return: async iterator of events
+        """
+        if maxsize is None or maxsize < 1:
+            # without a queue, nothing would be delivered to the iterator
+            raise ValueError("maxsize must be at least 1, not %r" % maxsize)
+        subscription = Subscription(
+            None, where=where, maxsize=maxsize, policy=policy, key=key
+        )
+        self.add_handler(event_type_or_domain, subscription)
+        try:
+            # make sure the domains are enabled, even when nothing else is sent
+            await self._register_handlers()
+            while True:
+                yield await subscription.get()
+        finally:
+            self.remove_handler(event_type_or_domain, subscription)
+
+    async def read_stream(
+        self, handle: cdp.io.StreamHandle, chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        reads a stream (for example returned by Page.printToPDF(transfer_mode="ReturnAsStream")
+        or Fetch.takeResponseBodyAsStream) in chunks, using IO.read. only a single chunk is held in
+        memory at a time, instead of the whole payload in a single (huge) message.
+        the stream is closed when done, or when the iteration is stopped early.
+
+        .. code-block::
+
+            async for chunk in tab.read_stream(handle):
+                sink.write(chunk)
 
+        :param handle: the stream handle
+        :param chunk_size: maximum number of bytes to read per request
+        :return: async iterator of bytes
+        """
+        try:
+            while True:
+                base64_encoded, data, eof = await self.send(
+                    cdp.io.read(handle, size=chunk_size)
+                )
+                if data:
+                    yield base64.b64decode(data) if base64_encoded else data.encode()
+                if eof:
+                    break
+        finally:
+            try:
+                await self.send(cdp.io.close(handle))
+            except ProtocolException:
+                # already closed
+                pass
+
+    async def save_stream(
+        self,
+        handle: cdp.io.StreamHandle,
+        path: Union[str, os.PathLike],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> int:
+        """
+        writes a stream to a file chunk by chunk, see :py:meth:`read_stream`
+
+        :param handle: the stream handle
+        :param path: the file to write
+        :param chunk_size: maximum number of bytes to read per request
+        :return: the number of bytes written
+        """
+        written = 0
+        with open(path, "wb") as file:
+            async for chunk in self.read_stream(handle, chunk_size):
+                file.write(chunk)
+                written += len(chunk)
+        return written
+
+    @staticmethod
+    def _event_types(
+        event_type_or_domain: Union[type, types.ModuleType, List[type]],
+    ) -> List[type]:
+        """
+        expands event types and/or domain modules to a list of event types
+        """
         if not isinstance(event_type_or_domain, list):
             event_type_or_domain = [event_type_or_domain]
-
+        event_types = []
+        known_event_types = set(EVENT_TYPES.values())
         for evt_dom in event_type_or_domain:
             if isinstance(evt_dom, types.ModuleType):
                 for name, obj in inspect.getmembers_static(evt_dom):
-                    if name.isupper():
-                        continue
-                    if not name[0].isupper():
-                        continue
-                    if type(obj) != type:
-                        continue
-                    if inspect.isbuiltin(obj):
-                        continue
-                    try:
-                        del self.handlers[obj]
-                    except KeyError:
-                        # missing key is not that important here
-                        pass
-                return
+                    if isinstance(obj, type) and obj in known_event_types:
+                        event_types.append(obj)
             else:
-                del self.handlers[evt_dom]
+                event_types.append(evt_dom)
+        return event_types
 
     async def connect(self, **kw):
         """
@@ -324,14 +1202,33 @@ class Connection(metaclass=CantTouchThis):
         :param kw:
         :return:
         """
-        if not self.websocket or bool(self.websocket.close_code):
+        if self._parent is not None:
+            async with self._connect_lock:
+                if self.closed:
+                    await self._attach()
+            return
+        async with self._connect_lock:
+            if not self.closed:
+                return
+            self._closing = False
             try:
-                self._websocket = await websockets.connect(
-                    self.websocket_url,
-                    ping_timeout=PING_TIMEOUT,
-                    max_size=MAX_SIZE,
-                )
+                if self._transport is not None:
+                    if self._transport.close_code is not None:
+                        raise ConnectionError("the browser pipe is closed")
+                    self._websocket = self._transport
+                else:
+                    self._websocket = await websockets.connect(
+                        self.websocket_url,
+                        ping_timeout=PING_TIMEOUT,
+                        max_size=MAX_SIZE,
+                        **self._connect_options(),
+                    )
+                    if self.remote_mode:
+                        self._tune_socket()
                 self._listener_task = asyncio.ensure_future(self._listener())
+                self._send_lanes = tuple(collections.deque() for _ in PRIORITIES)
+                self._send_ready = asyncio.Event()
+                self._writer_task = asyncio.ensure_future(self._writer())
 
             except (Exception,) as e:
                 logger.debug("exception during opening of websocket : %s", e)
@@ -339,14 +1236,127 @@ class Connection(metaclass=CantTouchThis):
 
             await self._register_handlers()
 
+    def _connect_options(self) -> Dict[str, Any]:
+        """
+        websocket options for the current mode. a local browser gains nothing from compression,
+        but pays for it in cpu. over a slow network however, the (very compressible) json
+        messages benefit from permessage-deflate, larger buffers and frequent pings,
+        which keep :py:attr:`rtt` up to date.
+        """
+        if not self.remote_mode:
+            return dict(compression=None)
+        return dict(
+            compression="deflate",
+            max_queue=REMOTE_MAX_QUEUE,
+            write_limit=REMOTE_WRITE_LIMIT,
+            ping_interval=REMOTE_PING_INTERVAL,
+            open_timeout=30,
+        )
+
+    def _tune_socket(self):
+        """
+        disables nagle's algorithm, so small commands are not held back waiting
+        for the acknowledgement of the previous segment
+        """
+        sock = self.websocket.transport.get_extra_info("socket")
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            logger.debug("could not set TCP_NODELAY: %s", e)
+
+    @property
+    def rtt(self) -> Optional[float]:
+        """
+        the last measured round trip time (in seconds) of the websocket, or None when not measured yet.
+        it is measured by the keepalive pings of the websocket, or by :py:meth:`measure_rtt`.
+        """
+        if self._parent is not None:
+            return self._parent.rtt
+        return getattr(self.websocket, "latency", None) or None
+
+    async def measure_rtt(self) -> float:
+        """
+        measures the round trip time to the browser, using a websocket ping
+
+        :return: the round trip time in seconds
+        """
+        if self._parent is not None:
+            return await self._parent.measure_rtt()
+        if self.closed:
+            await self.connect()
+        if self._transport is not None:
+            # pipes have no ping frames
+            started = time.perf_counter()
+            await self.send(cdp.browser.get_version(), _is_update=True)
+            return time.perf_counter() - started
+        pong = await self.websocket.ping()
+        return await pong
+
+    async def _attach(self):
+        """
+        attaches to the target as a flattened session over the parent connection
+        """
+        if self._parent.closed:
+            await self._parent.connect()
+        session_id = await self._parent.send(
+            cdp.target.attach_to_target(self.target.target_id, flatten=True),
+            _is_update=True,
+        )
+        self.session_id = session_id
+        self._parent.sessions[session_id] = self
+        logger.debug("attached to %s using session %s", self.target, session_id)
+        await self._register_handlers()
+
+    def _detached(self):
+        """
+        marks this session as detached, after which it will attach again on the next send().
+        """
+        if self._parent is not None and self.session_id:
+            self._parent.sessions.pop(self.session_id, None)
+            self._parent._fail_pending(
+                "session %s was detached" % self.session_id, self.session_id
+            )
+        self.session_id = None
+        self.enabled_domains.clear()
+        self._explicit_domains.clear()
+        self._handlers_dirty = True
+
     async def disconnect(self):
         """
         closes the websocket connection. should not be called manually by users.
         """
-        if self._listener_task:
+        register_task = self._register_task
+        if register_task is not None and register_task is not asyncio.current_task():
+            register_task.cancel()
+        if self._parent is not None:
+            session_id = self.session_id
+            self._detached()
+            if session_id and not self._parent.closed:
+                try:
+                    await self._parent.send(
+                        cdp.target.detach_from_target(session_id=session_id),
+                        _is_update=True,
+                    )
+                except ProtocolException:
+                    # target is already gone
+                    pass
+            return
+        self._closing = True
+        for session in list(self.sessions.values()):
+            session._detached()
+        self._fail_pending("connection to %s was closed" % self.websocket_url)
+        if self._listener_task and self._listener_task is not asyncio.current_task():
             self._listener_task.cancel()
+        if self._writer_task:
+            self._writer_task.cancel()
+        if self._bulk is not None:
+            await self._bulk.disconnect()
         if self.websocket:
             self.enabled_domains.clear()
+            self._explicit_domains.clear()
+            self._handlers_dirty = True
             await self.websocket.close()
             logger.debug("\n❌ closed websocket connection to %s", self.websocket_url)
 
@@ -370,134 +1380,423 @@ class Connection(metaclass=CantTouchThis):
         ensure that for current (event) handlers, the corresponding
         domain is enabled in the protocol.
 
+        the domains in use are tracked by :py:meth:`add_handler` and :py:meth:`remove_handler`,
+        which mark the connection dirty, so this is a no-op unless handlers changed.
+        domains which were enabled here, but are no longer used by any handler, are disabled.
+        domains which were enabled explicitly (by sending X.enable) are neither enabled nor disabled here.
         """
-        seen = []
-        # save a copy of current enabled domains in a variable
-        # domains will be removed from this variable
-        # if it is still needed according to the set handlers
-        # so at the end this variable will hold the domains that
-        # are not represented by handlers, and can be removed
-        enabled_domains = self.enabled_domains.copy()
-        for event_type in self.handlers.copy():
-            domain_mod = None
-            if len(self.handlers[event_type]) == 0:
-                self.handlers.pop(event_type)
-                continue
-            if isinstance(event_type, type):
-                domain_mod = util.cdp_get_module(event_type.__module__)
-            if domain_mod in self.enabled_domains:
-                # at this point, the domain is being used by a handler
-                # so remove that domain from temp variable 'enabled_domains' if present
-                if domain_mod in enabled_domains:
-                    enabled_domains.remove(domain_mod)
-                continue
-            elif domain_mod not in self.enabled_domains:
-                if domain_mod in (cdp.target, cdp.storage, cdp.input_):
+        if self.closed:
+            # connecting registers the handlers
+            return await self.connect()
+        async with self._register_lock:
+            self._handlers_dirty = False
+            for domain_mod, refs in list(self._domain_refs.items()):
+                if refs <= 0 or domain_mod in self.enabled_domains:
+                    continue
+                if domain_mod in DEFAULT_DOMAINS:
                     # by default enabled
                     continue
                 try:
+                    tx = Transaction(domain_mod.enable())
+                    if tx.method.partition(".")[0] in self._explicit_domains:
+                        continue
                     # we add this before sending the request, because it will
                     # loop indefinite
                     logger.debug("registered %s", domain_mod)
-                    self.enabled_domains.append(domain_mod)
-
-                    await self.send(domain_mod.enable(), _is_update=True)
-
+                    self.enabled_domains.add(domain_mod)
+                    await self._send_for_handlers(tx)
                 except:  # noqa - as broad as possible, we don't want an error before the "actual" request is sent
                     logger.debug("", exc_info=True)
-                    try:
-                        self.enabled_domains.remove(domain_mod)
-                    except:  # noqa
-                        logger.debug("NOT GOOD", exc_info=True)
-                        continue
-                finally:
+                    self.enabled_domains.discard(domain_mod)
+            for domain_mod in list(self.enabled_domains):
+                if self._domain_refs.get(domain_mod):
                     continue
-        for ed in enabled_domains:
-            # we started with a copy of self.enabled_domains and removed a domain from this
-            # temp variable when we registered it or saw handlers for it.
-            # items still present at this point are unused and need removal
-            self.enabled_domains.remove(ed)
+                # the last handler for this domain is gone, so stop
+                # chrome from sending (and us from receiving) its events
+                self.enabled_domains.discard(domain_mod)
+                if not hasattr(domain_mod, "disable") or self.closed:
+                    continue
+                try:
+                    tx = Transaction(domain_mod.disable())
+                    if tx.method.partition(".")[0] in self._explicit_domains:
+                        # enabled explicitly as well, so it stays enabled
+                        continue
+                    logger.debug("unregistered %s", domain_mod)
+                    await self._send_for_handlers(tx)
+                except:  # noqa
+                    logger.debug("", exc_info=True)
 
-    async def _listener(self):
-        seen_one = False
-        while True:
+    async def _send_for_handlers(self, tx: Transaction):
+        """
+        sends the enable or disable command of a domain on behalf of the handlers.
+        unlike :py:meth:`send`, it does not mark the domain as explicitly enabled.
+        """
+        await self._submit([tx], True)
+        return await self._wait_for(tx, [tx])
+
+    def _track_explicit_domains(self, txs: List[Transaction]):
+        """
+        keeps track of the domains which are enabled by explicit X.enable commands
+        """
+        for tx in txs:
+            domain, _, command = tx.method.partition(".")
+            if command == "enable":
+                self._explicit_domains.add(domain)
+            elif command == "disable":
+                self._explicit_domains.discard(domain)
+
+    def _count_domain_refs(self, event_type: type, delta: int):
+        """
+        updates the number of handlers using the domain of given event type
+        """
+        if not isinstance(event_type, type):
+            return
+        domain_mod = util.cdp_get_module(event_type.__module__)
+        self._domain_refs[domain_mod] += delta
+        self._handlers_dirty = True
+        if self._domain_refs[domain_mod] > 0:
+            return
+        del self._domain_refs[domain_mod]
+        if domain_mod in self.enabled_domains and not self.closed:
+            if self._register_task is not None and not self._register_task.done():
+                # the next send() registers what the running task missed
+                return
+            # disable the domain now, rather than on the next send()
             try:
-                async with self._lock:
-                    raw = await asyncio.wait_for(self.websocket.recv(), 0.05)
-            except ProtocolException:
-                break
-            except websockets.exceptions.ConnectionClosedOK:
-                await self.disconnect()
-                break
-            except websockets.exceptions.ConnectionClosed:
+                task = asyncio.get_running_loop().create_task(self._register_handlers())
+            except RuntimeError:
+                # no running loop, it will happen on the next send()
+                return
+            self._register_task = task
+            task.add_done_callback(self._registered)
+
+    def _registered(self, task: asyncio.Task):
+        if self._register_task is task:
+            self._register_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.info("could not disable domains of %s: %s", self, task.exception())
+
+    async def _listener(self):
+        """
+        reads messages from the websocket as soon as they arrive and dispatches them.
+        runs until the websocket is closed.
+        """
+        # binary codecs parse the raw frame bytes directly
+        decode = False if self.codec.binary else None
+        try:
+            while True:
+                raw = await self.websocket.recv(decode=decode)
+                if self.recorder is not None:
+                    self.recorder.record(INCOMING, raw)
+                await self._receive(raw)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except (Exception,) as e:
+            logger.info(
+                "error when receiving websocket response: %s" % e, exc_info=True
+            )
+            # nothing will read the responses anymore
+            self._fail_pending(
+                "error when receiving from %s: %s" % (self.websocket_url, e)
+            )
+            raise
+        if self.auto_reconnect and not self._closing and self._transport is None:
+            await self._reconnect()
+        else:
+            await self.disconnect()
+
+    def add_reconnect_hook(self, hook: Callable[[Connection], Awaitable]):
+        """
+        adds a coroutine function, which is called as hook(connection) after the connection
+        is reopened by auto reconnect. use it to restore protocol state which is not
+        tracked by the connection itself.
+
+        :param hook: coroutine function
+        """
+        if hook not in self._reconnect_hooks:
+            self._reconnect_hooks.append(hook)
+
+    def remove_reconnect_hook(self, hook: Callable[[Connection], Awaitable]):
+        """
+        removes a hook added using :py:meth:`add_reconnect_hook`
+        """
+        if hook in self._reconnect_hooks:
+            self._reconnect_hooks.remove(hook)
+
+    async def _reconnect(self):
+        """
+        reopens the connection after it was closed unexpectedly. called by the listener.
+
+        sessions are gone after the websocket closed, so their pending commands always fail.
+        pending commands of this connection fail as well, unless :py:attr:`retry_pending` is set,
+        in which case they are sent again using the same ids once the connection is back.
+        commands sent while reconnecting wait until then, so they are sent after those.
+        the enabled domains are enabled again, sessions which have handlers attach again
+        and finally the reconnect hooks are called.
+        """
+        logger.warning("connection to %s was lost, reconnecting", self.websocket_url)
+        sessions = list(self.sessions.values())
+        for session in sessions:
+            session._detached()
+        if not self.retry_pending:
+            self._fail_pending("connection to %s was lost" % self.websocket_url)
+        # the commands which were in flight when the connection was lost
+        retry_ids = [tx_id for tx_id, tx in self.mapper.items() if not tx.done()]
+        if self._writer_task:
+            self._writer_task.cancel()
+        self.enabled_domains.clear()
+        self._explicit_domains.clear()
+        self._handlers_dirty = True
+
+        reconnected = self._reconnected = asyncio.Event()
+        try:
+            for attempt in range(self.reconnect_attempts):
+                await asyncio.sleep(RECONNECT_DELAY * 2**attempt)
+                if self._closing:
+                    # disconnected explicitly meanwhile, or the target is gone
+                    self._fail_pending(
+                        "connection to %s was closed" % self.websocket_url
+                    )
+                    return
+                try:
+                    await self.connect()
+                    break
+                except (Exception,) as e:
+                    logger.debug(
+                        "reconnect attempt %d to %s failed: %s",
+                        attempt + 1,
+                        self.websocket_url,
+                        e,
+                    )
+            else:
+                logger.warning(
+                    "could not reconnect to %s after %d attempts",
+                    self.websocket_url,
+                    self.reconnect_attempts,
+                )
                 await self.disconnect()
-                break
-            except asyncio.TimeoutError as e:
-                await asyncio.sleep(0.05)
-                continue
+                return
+
+            logger.info("reconnected to %s", self.websocket_url)
+            pending = [
+                self.mapper[tx_id]
+                for tx_id in retry_ids
+                if tx_id in self.mapper and not self.mapper[tx_id].done()
+            ]
+            if pending:
+                dumps = self.codec.dumps
+                self._write([dumps(tx.payload) for tx in pending], PRIORITY_HIGH)
+        finally:
+            self._reconnected = None
+            reconnected.set()
+        for session in sessions:
+            if session.handlers and session.closed:
+                try:
+                    await session.connect()
+                except (Exception,) as e:
+                    logger.info("could not attach to %s again: %s", session.target, e)
+        for hook in list(self._reconnect_hooks):
+            try:
+                await hook(self)
             except (Exception,) as e:
                 logger.info(
-                    "error when receiving websocket response: %s" % e, exc_info=True
+                    "exception in reconnect hook %s: %s", hook, e, exc_info=True
                 )
+
+    async def _receive(self, raw: Union[str, bytes]):
+        """
+        parses and dispatches a single raw frame, as received on the websocket
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+            metrics.frame_received(_frame_size(raw))
+        try:
+            message = self._decode(raw)
+        except (Exception,) as e:
+            self._fail_undecodable(raw, e)
+            return
+        try:
+            blocked = self._handle_message(message)
+            if blocked is not None:
+                # a block subscription fell too far behind, stop reading until it has room
+                await blocked
+            if metrics is not None:
+                metrics.frame_dispatched(time.perf_counter() - started)
+        except (Exception,) as e:
+            logger.info("error when handling websocket message: %s" % e, exc_info=True)
+
+    def _decode(self, raw: Union[str, bytes]) -> dict:
+        """
+        decodes a frame using the codec of the connection. the fast codecs are stricter
+        than chrome, which puts lone surrogate escapes (\\udXXX) in strings of the Runtime
+        and DOM domains. those frames are decoded by the standard library json module instead.
+        """
+        try:
+            return self.codec.loads(raw)
+        except (Exception,):
+            if self.codec.name == "json":
                 raise
-            else:
-                message = json.loads(raw)
-                seen_one = True
-                if "id" in message:
-                    tx: Transaction = self.mapper.pop(message["id"])
-                    tx(**message)
-                    logger.debug("got answer for (message_id:%d) => %s", tx.id, message)
-                else:
-                    # probably an event
+            return json.loads(raw)
+
+    def _fail_undecodable(self, raw: Union[str, bytes], error: Exception):
+        """
+        fails the transaction a frame which could not be decoded was meant for,
+        so its caller does not wait forever
+        """
+        head = raw[:64]
+        if isinstance(head, (bytes, bytearray, memoryview)):
+            head = bytes(head).decode("utf-8", "replace")
+        match = RESPONSE_ID.match(head)
+        tx = self.mapper.pop(int(match.group(1)), None) if match else None
+        logger.info("could not decode websocket message (%s): %s", error, raw[:200])
+        if tx is not None and not tx.done():
+            tx.set_exception(
+                ProtocolException("could not decode the response: %s" % error)
+            )
+
+    def _handle_message(self, message: dict) -> Optional[Awaitable]:
+        """
+        routes a single message received on the websocket to the pending transaction
+        or to the event handlers of the connection (or session) it belongs to
+
+        :return: an awaitable when the listener has to wait for a full handler queue
+        """
+        if "id" in message:
+            tx: Transaction = self.mapper.pop(message["id"], None)
+            if tx is None or tx.done():
+                # the transaction timed out or got cancelled
+                logger.debug("discarded late answer => %s", message)
+                return
+            if self.metrics is not None and tx.sent_at is not None:
+                self.metrics.command_done(
+                    tx.method, time.perf_counter() - tx.sent_at, "error" in message
+                )
+            tx(**message)
+            logger.debug("got answer for (message_id:%d) => %s", tx.id, message)
+            return
+        method = message.get("method")
+        session_id = message.get("sessionId")
+        if self.metrics is not None:
+            self.metrics.event_received(method)
+        if method == "Target.detachedFromTarget":
+            session = self.sessions.get(message["params"]["sessionId"])
+            if session is not None:
+                session._detached()
+        elif method == "Target.targetCrashed":
+            for session in list(self.sessions.values()):
+                if session.target and session.target.target_id == message["params"].get(
+                    "targetId"
+                ):
+                    self._fail_pending("target crashed", session.session_id)
+        elif method == "Inspector.targetCrashed":
+            # pending commands of a crashed target are never answered
+            self._fail_pending("target crashed", session_id)
+        if session_id is not None:
+            # event for a flattened session
+            session = self.sessions.get(session_id)
+            if session is not None:
+                return session._handle_event(message)
+            return
+        return self._handle_event(message)
+
+    def _fail_pending(self, reason: str, session_id: cdp.target.SessionID = None):
+        """
+        fails pending transactions and removes them from the mapper, so nobody
+        awaits a response which will never come.
+
+        :param reason: message of the exception which is set on the transactions
+        :param session_id: when given, only the transactions of this session are failed
+        """
+        if self._parent is not None:
+            # the transactions of a session are kept by its parent
+            if self.session_id:
+                self._parent._fail_pending(reason, self.session_id)
+            return
+        for tx_id, tx in list(self.mapper.items()):
+            if session_id is not None and tx.session_id != session_id:
+                continue
+            del self.mapper[tx_id]
+            if not tx.done():
+                tx.set_exception(ProtocolException(reason))
+
+    def _handle_event(self, message: dict) -> Optional[Awaitable]:
+        """
+        parses an event and calls the handlers registered for it.
+        the event type is looked up by its raw method name first, so
+        events without handlers are discarded without being parsed.
+
+        :return: an awaitable when the listener has to wait for a full handler queue
+        """
+        event_type = EVENT_TYPES.get(message.get("method"))
+        # .get() as to not create empty entries in the defaultdict
+        callbacks = self.handlers.get(event_type)
+        if not callbacks:
+            return
+        self._last_activity = time.monotonic()
+        params = message["params"]
+        matched = []
+        blocked = []
+        for callback in callbacks:
+            if isinstance(callback, Subscription):
+                if not callback.matches(params):
+                    continue
+                if callback.maxsize is not None:
+                    # the subscription parses and delivers the event by itself
+                    waiting = callback.put(event_type, params, self)
+                    if waiting is not None:
+                        blocked.append(waiting)
+                    continue
+                callback = callback.handler
+            matched.append(callback)
+        if matched:
+            self._dispatch(event_type, params, matched)
+        if blocked:
+            return asyncio.gather(*blocked)
+
+    def _dispatch(self, event_type: type, params: dict, callbacks: List[Callable]):
+        """
+        parses the event and calls the (unbounded) handlers directly.
+        coroutine handlers are scheduled as tasks.
+        """
+        try:
+            event = event_type.from_json(params)
+        except Exception as e:
+            logger.info(
+                "%s: %s  during parsing of json from event : %s"
+                % (type(e).__name__, e.args, params),
+                exc_info=True,
+            )
+            return
+        for callback in callbacks:
+            try:
+                if iscoroutinefunction(callback) or iscoroutine(callback):
                     try:
-                        event = cdp.util.parse_json_event(message)
-                    except Exception as e:
-                        logger.info(
-                            "%s: %s  during parsing of json from event : %s"
-                            % (type(e).__name__, e.args, message),
-                            exc_info=True,
-                        )
-                        continue
-                    except KeyError as e:
-                        logger.info("some lousy KeyError %s" % e, exc_info=True)
-                        continue
+
+                        asyncio.create_task(callback(event, self))
+                    except TypeError as e:
+                        asyncio.create_task(callback(event))
+                else:
                     try:
-                        if type(event) in self.handlers:
-                            callbacks = self.handlers[type(event)]
-                        else:
-                            continue
-                        if not len(callbacks):
-                            continue
-                        for callback in callbacks:
-                            try:
-                                if iscoroutinefunction(callback) or iscoroutine(
-                                    callback
-                                ):
-                                    try:
-
-                                        asyncio.create_task(callback(event, self))
-                                    except TypeError as e:
-                                        asyncio.create_task(callback(event))
-                                else:
-                                    try:
-                                        callback(event, self)
-                                    except TypeError:
-                                        callback(event)
-                            except Exception as e:
-                                logger.warning(
-                                    "exception in callback %s for event %s => %s",
-                                    callback,
-                                    event.__class__.__name__,
-                                    e,
-                                    exc_info=True,
-                                )
-                                # since it's handlers, don't raise and screw our program
-
-                    except (Exception,) as e:
-                        raise
+                        callback(event, self)
+                    except TypeError:
+                        callback(event)
+            except Exception as e:
+                logger.warning(
+                    "exception in callback %s for event %s => %s",
+                    callback,
+                    event.__class__.__name__,
+                    e,
+                    exc_info=True,
+                )
+                # since it's handlers, don't raise and screw our program
 
     async def send(
-        self, cdp_obj: Generator[dict[str, Any], dict[str, Any], Any], _is_update=False
+        self,
+        cdp_obj: Generator[dict[str, Any], dict[str, Any], Any],
+        _is_update=False,
+        timeout: Optional[float] = None,
+        priority: Optional[int] = None,
     ) -> Any:
         """
         send a protocol command. the commands are made using any of the cdp.<domain>.<method>()'s
@@ -508,18 +1807,208 @@ class Connection(metaclass=CantTouchThis):
         :param _is_update: internal flag
             prevents infinite loop by skipping the registeration of handlers
             when multiple calls to connection.send() are made
+        :param timeout: seconds to wait for the response, after which asyncio.TimeoutError is raised.
+            defaults to :py:attr:`command_timeout` (None: wait indefinitely)
+        :param priority: PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_BULK. queued commands of a higher
+            priority are written before queued commands of a lower priority. only commands of the same
+            priority are guaranteed to keep their order. defaults to the priority in :py:data:`COMMAND_PRIORITIES`.
+            when :py:attr:`bulk_connection` is set, the bulk commands in :py:data:`BULK_CONNECTION_COMMANDS`
+            are sent over a websocket of their own.
+        :return:
+        """
+        tx = Transaction(cdp_obj)
+        self._track_explicit_domains([tx])
+        if priority is None:
+            priority = command_priority(tx.method)
+        if (
+            priority == PRIORITY_BULK
+            and tx.method in BULK_CONNECTION_COMMANDS
+            and self._use_bulk_connection()
+        ):
+            if self._bulk is None:
+                self._bulk = Connection(
+                    self.websocket_url, target=self.target, browser=self.browser
+                )
+            await self._bulk._submit([tx], True, priority)
+            return await self._bulk._wait_for(tx, [tx], timeout)
+        await self._submit([tx], _is_update, priority)
+        return await self._wait_for(tx, [tx], timeout)
+
+    async def send_many(
+        self,
+        cdp_objs: List[Generator[dict[str, Any], dict[str, Any], Any]],
+        return_exceptions: bool = False,
+        timeout: Optional[float] = None,
+        priority: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        send multiple protocol commands at once. all commands are written to the websocket
+        before any response is awaited, so the whole batch costs a single round trip.
+        the results are returned in the same order as the commands.
+
+        .. code-block::
+
+            node_ids = await tab.send_many(
+                [cdp.dom.request_node(object_id) for object_id in object_ids]
+            )
+
+        :param cdp_objs: the generator objects created by cdp methods
+        :param return_exceptions: when True, exceptions are returned in the result list
+            instead of being raised
+        :param timeout: seconds to wait for all responses, see :py:meth:`send`
+        :param priority: priority of all commands, see :py:meth:`send`. by default, the highest
+            default priority of the commands. the commands of a batch are always written in order.
+        :return: list of results
+        """
+        txs = [Transaction(cdp_obj) for cdp_obj in cdp_objs]
+        self._track_explicit_domains(txs)
+        await self._submit(txs, priority=priority)
+        return await self._wait_for(
+            asyncio.gather(*txs, return_exceptions=return_exceptions), txs, timeout
+        )
+
+    async def _wait_for(
+        self,
+        awaitable: Awaitable,
+        txs: List[Transaction],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        awaits the response(s) of transactions. on timeout or cancellation, the
+        transactions are cancelled and evicted from the mapper.
+        """
+        if timeout is None:
+            timeout = self.command_timeout
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(
+                "no response for %s within %s seconds"
+                % (", ".join(tx.method for tx in txs), timeout)
+            ) from None
+        finally:
+            mapper = self._parent.mapper if self._parent is not None else self.mapper
+            for tx in txs:
+                if not tx.done():
+                    tx.cancel()
+                mapper.pop(tx.id, None)
+
+    def batch(self, return_exceptions: bool = False) -> CommandBatch:
+        """
+        collect commands which are sent together using :py:meth:`send_many`
+        when the context exits (or the batch is awaited).
+
+        .. code-block::
+
+            async with tab.batch() as batch:
+                for key, value in items.items():
+                    batch.add(cdp.dom_storage.set_dom_storage_item(storage_id, key, value))
+            print(batch.results)
+
+        :param return_exceptions: see :py:meth:`send_many`
         :return:
+        :rtype: CommandBatch
+        """
+        return CommandBatch(self, return_exceptions=return_exceptions)
+
+    def _use_bulk_connection(self) -> bool:
+        """
+        a separate websocket for bulk commands only makes sense when this connection
+        has a websocket of its own: flattened sessions and pipes share a single stream.
+        """
+        return (
+            self.bulk_connection
+            and self._parent is None
+            and self._transport is None
+            and self.websocket_url is not None
+        )
+
+    async def _submit(
+        self,
+        txs: List[Transaction],
+        _is_update=False,
+        priority: Optional[int] = None,
+    ):
+        """
+        assigns ids to the transactions and queues them for sending
+
+        :param priority: priority of all transactions. None uses the highest default priority of the commands.
+            the transactions are written in order, using a single lane.
         """
+        if priority is not None and priority not in PRIORITIES:
+            raise ValueError("invalid priority: %r" % priority)
+        self._last_activity = time.monotonic()
+        # flattened sessions share the websocket, id counter and
+        # transaction mapper of their parent connection
+        conn = self
+        if self._parent is not None:
+            conn = self._parent
+        if conn._reconnected is not None and not _is_update:
+            # the commands which were in flight when the connection was lost go first
+            await conn._reconnected.wait()
+        if self._register_task is not None and not _is_update:
+            # a domain is being disabled in the background, which goes first
+            await asyncio.wait([self._register_task])
         if self.closed:
             await self.connect()
-        if not _is_update:
+        if not _is_update and self._handlers_dirty:
             await self._register_handlers()
-        tx = Transaction(cdp_obj)
-        the_id = next(self.__count__)
-        tx.id = the_id
-        self.mapper[the_id] = tx
-        asyncio.create_task(self.websocket.send(tx.message))
-        return await tx
+        if self.closed or conn._writer_task is None or conn._writer_task.done():
+            # the connection closed while the handlers were registered.
+            # nothing would write the frames, or fail the transactions
+            raise ProtocolException("connection to %s was closed" % conn.websocket_url)
+        for tx in txs:
+            tx.session_id = self.session_id
+            tx.id = next(conn.__count__)
+            conn.mapper[tx.id] = tx
+        frames = [conn.codec.dumps(tx.payload) for tx in txs]
+        metrics = conn.metrics
+        if metrics is not None:
+            now = time.perf_counter()
+            for tx, frame in zip(txs, frames):
+                tx.sent_at = now
+                metrics.command_sent(tx.method, _frame_size(frame))
+        if priority is None:
+            priority = min(command_priority(tx.method) for tx in txs)
+        conn._write(frames, priority)
+
+    def _write(self, frames: List[Union[str, bytes]], priority: int = PRIORITY_NORMAL):
+        """
+        queues frames for the writer task of this connection
+
+        :param priority: the lane to queue the frames in, they keep their order
+        """
+        self._send_lanes[priority].extend(frames)
+        self._send_ready.set()
+
+    async def _writer(self):
+        """
+        writes queued frames to the websocket. every next frame is taken from the highest
+        priority lane which has frames, so frames queued while the websocket was busy
+        overtake queued frames of a lower priority.
+        """
+        lanes = self._send_lanes
+        ready = self._send_ready
+        websocket = self.websocket
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                while True:
+                    for lane in lanes:
+                        if lane:
+                            break
+                    else:
+                        break
+                    frame = lane.popleft()
+                    if self.recorder is not None:
+                        self.recorder.record(OUTGOING, frame)
+                    await websocket.send(frame, text=True)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except (Exception,) as e:
+            logger.info("error when writing to websocket: %s" % e, exc_info=True)
+            raise
 
     async def _send_oneshot(self, cdp_obj):
         """fire and forget , eg: send command without waiting for any response"""
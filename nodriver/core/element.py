@@ -861,7 +861,6 @@ class Element:
         :rtype: str
         """
 
-        import base64
         import datetime
         import urllib.parse
 
@@ -904,10 +903,11 @@ class Element:
                 "could not take screenshot. most possible cause is the page has not finished loading yet."
             )
 
-        data_bytes = base64.b64decode(data)
         if not path:
             raise RuntimeError("invalid filename or path: '%s'" % filename)
-        path.write_bytes(data_bytes)
+        # there is no stream transfer mode for screenshots, but at least
+        # the decoded image is never held in memory as a whole
+        util.write_base64(path, data)
         return str(path)
 
     async def flash(self, duration: typing.Union[float, int] = 0.5):
@@ -0,0 +1,193 @@
+# Copyright 2024 by UltrafunkAmsterdam (https://github.com/UltrafunkAmsterdam)
+# All rights reserved.
+# This file is part of the nodriver package.
+# and is released under the "GNU AFFERO GENERAL PUBLIC LICENSE".
+# Please see the LICENSE.txt file that should have been included as part of this package.
+
+from __future__ import annotations
+
+import bisect
+import collections
+import logging
+import math
+from typing import Any, Callable, Dict, List
+
+__all__ = ["ConnectionMetrics", "Histogram"]
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (in seconds) of the histogram buckets
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    math.inf,
+)
+
+MetricsHook = Callable[[str, str, float], Any]
+
+
+class Histogram:
+    """
+    fixed bucket histogram of durations (in seconds)
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total", "min", "max")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """
+        estimates the q-th percentile (0-100) as the upper bound of the bucket it falls in.
+        the last bucket reports the maximum instead of infinity.
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": {
+                str(bound): count
+                for bound, count in zip(self.buckets, self.counts)
+                if count
+            },
+        }
+
+
+class ConnectionMetrics:
+    """
+    collects the traffic statistics of a connection: per cdp method call counts and latencies,
+    bytes and frames in and out, event counts per event and the lag of the listener.
+
+    it is created by :py:meth:`nodriver.Connection.enable_metrics`. as long as metrics
+    are not enabled, the connection does not collect anything.
+
+    hooks are called as hook(kind, name, value), where kind is one of
+    "command" (name: the method, value: latency), "event" (name: the method, value: 1),
+    "dispatch" (time spent in the listener on a single frame) or "lag" (event loop lag).
+    """
+
+    def __init__(
+        self,
+        inflight: Callable[[], int] = None,
+        hooks: List[MetricsHook] = None,
+    ):
+        self._inflight = inflight
+        self.hooks: List[MetricsHook] = list(hooks or [])
+        self.commands: Dict[str, Histogram] = collections.defaultdict(Histogram)
+        self.errors: Dict[str, int] = collections.Counter()
+        self.events: Dict[str, int] = collections.Counter()
+        self.dispatch = Histogram()
+        self.lag = Histogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def command_sent(self, method: str, size: int):
+        self.frames_out += 1
+        self.bytes_out += size
+
+    def command_done(self, method: str, latency: float, error: bool = False):
+        self.commands[method].add(latency)
+        if error:
+            self.errors[method] += 1
+        if self.hooks:
+            self._call_hooks("command", method, latency)
+
+    def frame_received(self, size: int):
+        self.frames_in += 1
+        self.bytes_in += size
+
+    def event_received(self, method: str):
+        self.events[method] += 1
+        if self.hooks:
+            self._call_hooks("event", method, 1)
+
+    def frame_dispatched(self, duration: float):
+        self.dispatch.add(duration)
+        if self.hooks:
+            self._call_hooks("dispatch", "", duration)
+
+    def loop_lag(self, lag: float):
+        self.lag.add(lag)
+        if self.hooks:
+            self._call_hooks("lag", "", lag)
+
+    def _call_hooks(self, kind: str, name: str, value: float):
+        for hook in self.hooks:
+            try:
+                hook(kind, name, value)
+            except Exception:  # noqa
+                logger.debug("exception in metrics hook %s", hook, exc_info=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        returns the current statistics as a (json serializable) dict
+        """
+        return {
+            "commands": {
+                method: {**histogram.snapshot(), "errors": self.errors.get(method, 0)}
+                for method, histogram in self.commands.items()
+            },
+            "events": dict(self.events),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "inflight": self._inflight() if self._inflight else 0,
+            "dispatch": self.dispatch.snapshot(),
+            "loop_lag": self.lag.snapshot(),
+        }
+
+    def reset(self):
+        """
+        clears all statistics, keeps the hooks
+        """
+        self.__init__(self._inflight, self.hooks)
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} commands: {sum(h.count for h in self.commands.values())} "
+            f"events: {sum(self.events.values())} in: {self.bytes_in}B out: {self.bytes_out}B>"
+        )
@@ -0,0 +1,369 @@
+# Copyright 2024 by UltrafunkAmsterdam (https://github.com/UltrafunkAmsterdam)
+# All rights reserved.
+# This file is part of the nodriver package.
+# and is released under the "GNU AFFERO GENERAL PUBLIC LICENSE".
+# Please see the LICENSE.txt file that should have been included as part of this package.
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import urllib.parse
+from typing import Callable, Optional, Set, Union
+
+from .. import cdp
+from . import util
+from .browser import Browser
+from .config import Config
+from .connection import ProtocolException
+
+__all__ = ["BrowserPool", "BrowserLease"]
+
+logger = logging.getLogger(__name__)
+
+LAUNCH_RETRY_DELAY: float = 1.0  # doubled for every next failed launch of a replacement
+LAUNCH_RETRY_MAX_DELAY: float = 30.0
+
+
+class _PooledBrowser:
+    __slots__ = ("browser", "created_at", "uses", "origins")
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.created_at = time.monotonic()
+        self.uses = 0
+        # origins visited during the current lease, which have their storage cleared on return
+        self.origins: Set[str] = set()
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    def add_origin(self, url: str):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme in ("http", "https"):
+            self.origins.add(f"{parsed.scheme}://{parsed.netloc}")
+
+    def track_origin(
+        self, event: Union[cdp.target.TargetCreated, cdp.target.TargetInfoChanged]
+    ):
+        self.add_origin(event.target_info.url)
+
+
+class BrowserLease:
+    """
+    a browser leased from a :py:class:`BrowserPool`. use it as async context manager,
+    which returns the browser to the pool when the block exits.
+
+    .. code-block::
+
+        async with pool.lease() as browser:
+            tab = await browser.get("https://example.com")
+    """
+
+    def __init__(self, pool: BrowserPool, timeout: Optional[float] = None):
+        self._pool = pool
+        self._timeout = timeout
+        self.browser: Optional[Browser] = None
+
+    async def __aenter__(self) -> Browser:
+        self.browser = await self._pool.acquire(self._timeout)
+        return self.browser
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        browser, self.browser = self.browser, None
+        if browser is not None:
+            await self._pool.release(browser)
+
+
+class BrowserPool:
+    """
+    keeps a number of launched browsers ready for use, so jobs don't pay for the startup of a browser.
+
+    browsers are leased using :py:meth:`lease` (or :py:meth:`acquire` and :py:meth:`release`).
+    when a browser is returned, it is reset: extra tabs are closed, the remaining tab navigates
+    to about:blank, and cookies, cache and the storage of visited origins are cleared.
+    a browser is replaced by a fresh one after max_uses leases, after max_age seconds or
+    when it could not be reset. a replacement which fails to launch is retried (with backoff),
+    so the pool keeps its size: idle + leased + launching == size.
+
+    .. code-block::
+
+        async with BrowserPool(size=4, headless=True, max_uses=50) as pool:
+
+            async def job(url):
+                async with pool.lease() as browser:
+                    tab = await browser.get(url)
+                    return await tab.get_content()
+
+            pages = await asyncio.gather(*(job(url) for url in urls))
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        config_factory: Callable[[], Config] = None,
+        max_uses: Optional[int] = None,
+        max_age: Optional[float] = None,
+        **kwargs,
+    ):
+        """
+        :param size: number of browsers in the pool
+        :param config_factory: function returning a new :py:class:`Config` for every browser which is launched.
+            every browser needs a config of its own, since a config is updated by the browser using it.
+            when omitted, Config(**kwargs) is used.
+        :param max_uses: number of leases after which a browser is replaced. None for unlimited
+        :param max_age: number of seconds after which a browser is replaced. None for unlimited
+        :param kwargs: passed to :py:class:`Config` when no config_factory is given
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.config_factory = config_factory or (lambda: Config(**kwargs))
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._idle: asyncio.Queue[_PooledBrowser] = asyncio.Queue()
+        self._leased: dict = {}  # id(browser) => _PooledBrowser
+        self._launching: Set[asyncio.Task] = set()
+        # pulsed when launching a replacement failed or the pool closed, see _next_idle()
+        self._wake_waiters = asyncio.Event()
+        self._launch_error: Optional[BaseException] = None
+        self._closed = False
+        self._started = False
+
+    @property
+    def idle(self) -> int:
+        """number of browsers ready to be leased"""
+        return self._idle.qsize()
+
+    @property
+    def leased(self) -> int:
+        """number of browsers currently leased"""
+        return len(self._leased)
+
+    @property
+    def launching(self) -> int:
+        """number of browsers being launched to replace retired ones"""
+        return len(self._launching)
+
+    async def start(self) -> BrowserPool:
+        """
+        launches the browsers of the pool (concurrently) and waits until they are ready.
+        when one of them fails to launch, the others are stopped and the error is raised.
+        """
+        if not self._started:
+            self._started = True
+            try:
+                await asyncio.gather(*(self._launch() for _ in range(self.size)))
+            except (Exception,):
+                await self.close()
+                raise
+        return self
+
+    def lease(self, timeout: Optional[float] = None) -> BrowserLease:
+        """
+        lease a browser, for use as async context manager
+
+        :param timeout: seconds to wait for a browser to become available, after which
+            asyncio.TimeoutError is raised. None to wait indefinitely.
+        """
+        return BrowserLease(self, timeout)
+
+    async def acquire(self, timeout: Optional[float] = None) -> Browser:
+        """
+        take a browser from the pool. it must be returned using :py:meth:`release`
+
+        :param timeout: seconds to wait for a browser to become available, after which
+            asyncio.TimeoutError is raised. None to wait indefinitely.
+            when no browser is leased and launching a browser fails meanwhile,
+            the exception of the launch is raised instead of waiting any longer.
+            when the pool is closed meanwhile, RuntimeError is raised.
+        """
+        if self._closed:
+            raise RuntimeError("the pool is closed")
+        if not self._started:
+            await self.start()
+        while True:
+            item = await self._next_idle(timeout)
+            if self._dead(item) or self._expired(item):
+                # went stale while waiting in the pool
+                self._replace(item)
+                continue
+            break
+        item.uses += 1
+        item.origins.clear()
+        item.browser.connection.add_handler(
+            [cdp.target.TargetCreated, cdp.target.TargetInfoChanged],
+            item.track_origin,
+        )
+        self._leased[id(item.browser)] = item
+        return item.browser
+
+    async def release(self, browser: Browser):
+        """
+        return a browser to the pool, which resets its state, or replaces it by a new one
+
+        :param browser: a browser taken by :py:meth:`acquire`
+        """
+        item = self._leased.pop(id(browser), None)
+        if item is None:
+            raise ValueError("%s was not leased from this pool" % browser)
+        browser.connection.remove_handler(
+            [cdp.target.TargetCreated, cdp.target.TargetInfoChanged],
+            item.track_origin,
+        )
+        if self._closed:
+            self._retire(item)
+            return
+        if self._dead(item) or self._expired(item):
+            self._replace(item)
+            return
+        try:
+            await self._reset(item)
+        except (Exception,) as e:
+            logger.info("could not reset %s, replacing it: %s", browser, e)
+            self._replace(item)
+            return
+        self._idle.put_nowait(item)
+
+    async def _next_idle(self, timeout: Optional[float]) -> _PooledBrowser:
+        """
+        waits for an idle browser, or for a failed launch while no browser is leased,
+        since then nothing else would make a browser available, or for the pool to close
+        """
+        if self._launch_error is not None and self._idle.empty() and not self._leased:
+            raise self._launch_error
+        getter = asyncio.ensure_future(self._idle.get())
+        woken = asyncio.ensure_future(self._wake_waiters.wait())
+        try:
+            done, _ = await asyncio.wait(
+                (getter, woken), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            woken.cancel()
+            if not getter.done():
+                getter.cancel()
+        if getter in done:
+            if self._closed:
+                self._retire(getter.result())
+                raise RuntimeError("the pool is closed")
+            return getter.result()
+        if woken in done:
+            if self._closed:
+                raise RuntimeError("the pool is closed")
+            raise self._launch_error
+        raise asyncio.TimeoutError(
+            "no browser became available within %s seconds" % timeout
+        )
+
+    async def close(self):
+        """
+        stops all browsers. leased browsers are stopped when they are returned.
+        """
+        self._closed = True
+        # waiting callers would wait forever
+        self._wake_waiters.set()
+        self._wake_waiters.clear()
+        for task in list(self._launching):
+            task.cancel()
+        while not self._idle.empty():
+            self._retire(self._idle.get_nowait())
+
+    async def __aenter__(self) -> BrowserPool:
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @staticmethod
+    def _dead(item: _PooledBrowser) -> bool:
+        browser = item.browser
+        if browser.connection is None or browser.connection.closed:
+            return True
+        # connected to an existing browser, there is no process
+        return browser._process is not None and browser._process.returncode is not None
+
+    def _expired(self, item: _PooledBrowser) -> bool:
+        if self.max_uses is not None and item.uses >= self.max_uses:
+            return True
+        if self.max_age is not None and item.age >= self.max_age:
+            return True
+        return False
+
+    async def _launch(self):
+        browser = await Browser.create(self.config_factory())
+        if self._closed:
+            self._retire(_PooledBrowser(browser))
+            return
+        self._idle.put_nowait(_PooledBrowser(browser))
+
+    def _replace(self, item: _PooledBrowser):
+        """
+        retires a browser and launches a new one in the background
+        """
+        self._retire(item)
+        if self._closed:
+            return
+        task = asyncio.ensure_future(self._relaunch())
+        self._launching.add(task)
+        task.add_done_callback(self._launching.discard)
+
+    async def _relaunch(self):
+        """
+        launches a replacement, until it succeeds or the pool is closed
+        """
+        attempt = 0
+        while not self._closed:
+            try:
+                await self._launch()
+                self._launch_error = None
+                return
+            except (Exception,) as e:
+                delay = min(LAUNCH_RETRY_DELAY * 2**attempt, LAUNCH_RETRY_MAX_DELAY)
+                attempt += 1
+                logger.warning(
+                    "could not launch a browser for the pool (attempt %d), "
+                    "retrying in %.1f seconds: %s",
+                    attempt,
+                    delay,
+                    e,
+                )
+                self._launch_error = e
+                if not self._leased:
+                    # no browser will be returned either, so let the waiting callers know
+                    self._wake_waiters.set()
+                    self._wake_waiters.clear()
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retire(item: _PooledBrowser):
+        logger.debug("retiring %s after %d uses", item.browser, item.uses)
+        # deconstruct_browser only cleans up, the browser is still registered
+        # for the cleanup at exit, which would keep it alive until then
+        util.get_registered_instances().discard(item.browser)
+        util.deconstruct_browser(item.browser)
+
+    @staticmethod
+    async def _reset(item: _PooledBrowser):
+        """
+        brings a returned browser back into a clean state
+        """
+        browser = item.browser
+        tabs = browser.tabs
+        if not tabs:
+            raise ProtocolException("no tab left")
+        keep, extra = tabs[0], tabs[1:]
+        for tab in tabs:
+            # storage of the origins which are still open is cleared as well
+            item.add_origin(tab.url)
+        commands = [cdp.target.close_target(tab.target_id) for tab in extra]
+        commands.append(cdp.storage.clear_cookies())
+        commands.extend(
+            cdp.storage.clear_data_for_origin(origin, "all") for origin in item.origins
+        )
+        await browser.connection.send_many(commands)
+        await keep.send_many(
+            [cdp.network.clear_browser_cache(), cdp.page.navigate("about:blank")]
+        )
+        item.origins.clear()
@@ -0,0 +1,189 @@
+# Copyright 2024 by UltrafunkAmsterdam (https://github.com/UltrafunkAmsterdam)
+# All rights reserved.
+# This file is part of the nodriver package.
+# and is released under the "GNU AFFERO GENERAL PUBLIC LICENSE".
+# Please see the LICENSE.txt file that should have been included as part of this package.
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import lzma
+import os
+import pathlib
+import time
+from typing import IO, TYPE_CHECKING, Iterator, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from .connection import Connection
+
+__all__ = ["Recorder", "Replayer", "INCOMING", "OUTGOING"]
+
+logger = logging.getLogger(__name__)
+
+INCOMING = "in"
+OUTGOING = "out"
+# recording is on the hot path of the connection, higher levels cost a lot of cpu
+COMPRESSION_LEVEL: int = 1
+
+PathLike = Union[str, os.PathLike]
+
+
+def _open(path: PathLike, mode: str, level: Optional[int] = None) -> IO[str]:
+    """
+    opens a (compressed) text file. the compression is derived from the file suffix:
+    .gz uses gzip, .xz and .lzma use lzma, anything else is not compressed.
+
+    :param level: compression level (0-9) when writing, used as the preset of lzma
+    """
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix == ".gz":
+        if level is None:
+            return gzip.open(path, mode, encoding="utf-8")
+        return gzip.open(path, mode, compresslevel=level, encoding="utf-8")
+    if suffix in (".xz", ".lzma"):
+        return lzma.open(path, mode, preset=level, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Recorder:
+    """
+    writes raw cdp frames to a json lines file, one frame per line:
+
+    .. code-block::
+
+        {"t": 0.001234, "dir": "out", "data": "{\\"id\\":1,\\"method\\":\\"Page.enable\\",...}"}
+        {"t": 0.002345, "dir": "in", "data": "{\\"id\\":1,\\"result\\":{}}"}
+
+    t is the number of seconds (monotonic) since the recording started, dir is "in" or "out"
+    and data is the frame exactly as it was sent or received.
+
+    a recorder is created by :py:meth:`nodriver.Connection.start_recording`.
+    """
+
+    def __init__(self, path: PathLike, level: int = None):
+        """
+        :param path: the file to write. use a .gz, .xz or .lzma suffix to compress it.
+        :param level: compression level, from 0 (fastest) to 9 (smallest).
+            defaults to :py:data:`COMPRESSION_LEVEL`
+        """
+        self.path = path
+        self.frames = 0
+        if level is None:
+            level = COMPRESSION_LEVEL
+        self._file = _open(path, "wt", level)
+        self._start = time.monotonic()
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def record(self, direction: str, data: Union[str, bytes]):
+        """
+        writes a single frame
+
+        :param direction: "in" or "out"
+        :param data: the raw frame
+        """
+        if self._file is None:
+            return
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data).decode("utf-8")
+        self._file.write(
+            json.dumps(
+                {
+                    "t": round(time.monotonic() - self._start, 6),
+                    "dir": direction,
+                    "data": data,
+                },
+                separators=(",", ":"),
+            )
+        )
+        self._file.write("\n")
+        self.frames += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.debug("recorded %d frames to %s", self.frames, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.path} frames: {self.frames}>"
+
+
+class Replayer:
+    """
+    reads a recording made by :py:class:`Recorder` and feeds the received frames into a connection,
+    exactly as if they were received from the browser. no browser is needed for this, which makes
+    it useful to profile the parsing and dispatching of events, or to reproduce slowdowns offline.
+
+    .. code-block::
+
+        connection = Connection(None)
+        connection.add_handler(cdp.network.ResponseReceived, on_response)
+        count = await Replayer("session.jsonl.gz").replay(connection)
+
+    note that events of flattened sessions are only dispatched when the connection has a session
+    with the same session id. responses to commands are discarded, since no command is pending for them.
+    """
+
+    def __init__(self, path: PathLike):
+        """
+        :param path: the recording to read
+        """
+        self.path = path
+
+    def frames(
+        self, direction: Optional[str] = INCOMING
+    ) -> Iterator[Tuple[float, str, str]]:
+        """
+        iterates the recorded frames
+
+        :param direction: only yield frames of this direction, None yields all
+        :return: iterator of (time, direction, data)
+        """
+        with _open(self.path, "rt") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if direction is not None and entry["dir"] != direction:
+                    continue
+                yield entry["t"], entry["dir"], entry["data"]
+
+    async def replay(
+        self, connection: Connection, speed: Optional[float] = None
+    ) -> int:
+        """
+        feeds the received frames into the connection
+
+        :param connection: the connection to feed the frames into
+        :param speed: None replays the frames as fast as possible.
+            otherwise, the recorded timing is kept, 1.0 being real time, 2.0 twice as fast.
+        :return: the number of frames replayed
+        """
+        count = 0
+        started = time.monotonic()
+        for t, _, data in self.frames(INCOMING):
+            if speed:
+                delay = t / speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await connection._receive(data)
+            count += 1
+            if not count % 1000:
+                # let handler tasks run in between
+                await asyncio.sleep(0)
+        return count
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.path}>"
@@ -391,14 +391,10 @@ class Tab(Connection):
         return items
 
     async def sleep(self, t: float | int = 1):
-        if self.browser:
-            await asyncio.wait(
-                [
-                    asyncio.create_task(self.browser.update_targets()),
-                    asyncio.create_task(asyncio.sleep(t)),
-                ],
-                return_when=asyncio.ALL_COMPLETED,
-            )
+        """
+        wait for <t> seconds. this is a plain timer, it does not talk to the browser.
+        """
+        await asyncio.sleep(t)
 
     async def xpath(
         self, xpath: str, timeout: float = 2.5
@@ -611,16 +607,23 @@ class Tab(Connection):
         :rtype:
         """
         text = text.strip()
-        doc = await self.send(cdp.dom.get_document(-1, True))
-        search_id, nresult = await self.send(cdp.dom.perform_search(text, True))
+        # independent commands are sent together, to save round trips
+        doc, (search_id, nresult) = await self.send_many(
+            [
+                cdp.dom.get_document(-1, True),
+                cdp.dom.perform_search(text, True),
+            ]
+        )
         if nresult:
-            node_ids = await self.send(
-                cdp.dom.get_search_results(search_id, 0, nresult)
+            node_ids, _ = await self.send_many(
+                [
+                    cdp.dom.get_search_results(search_id, 0, nresult),
+                    cdp.dom.discard_search_results(search_id),
+                ]
             )
         else:
             node_ids = []
-
-        await self.send(cdp.dom.discard_search_results(search_id))
+            await self.send(cdp.dom.discard_search_results(search_id))
 
         items = []
         for nid in node_ids:
@@ -700,16 +703,23 @@ class Tab(Connection):
         :return:
         :rtype:
         """
-        doc = await self.send(cdp.dom.get_document(-1, True))
         text = text.strip()
-        search_id, nresult = await self.send(cdp.dom.perform_search(text, True))
+        doc, (search_id, nresult) = await self.send_many(
+            [
+                cdp.dom.get_document(-1, True),
+                cdp.dom.perform_search(text, True),
+            ]
+        )
         if nresult:
-            node_ids = await self.send(
-                cdp.dom.get_search_results(search_id, 0, nresult)
+            node_ids, _ = await self.send_many(
+                [
+                    cdp.dom.get_search_results(search_id, 0, nresult),
+                    cdp.dom.discard_search_results(search_id),
+                ]
             )
         else:
             node_ids = None
-        await self.send(cdp.dom.discard_search_results(search_id))
+            await self.send(cdp.dom.discard_search_results(search_id))
         if not node_ids:
             node_ids = []
         items = []
@@ -1424,14 +1434,68 @@ class Tab(Connection):
             raise ProtocolException(
                 "could not take screenshot. most possible cause is the page has not finished loading yet."
             )
-        import base64
-
-        data_bytes = base64.b64decode(data)
         if not path:
             raise RuntimeError("invalid filename or path: '%s'" % filename)
-        path.write_bytes(data_bytes)
+        # there is no stream transfer mode for screenshots, but at least
+        # the decoded image is never held in memory as a whole
+        util.write_base64(path, data)
+        return str(path)
+
+    async def stream_pdf(self, **options) -> typing.AsyncIterator[bytes]:
+        """
+        prints the page as pdf, and yields the pdf in chunks as they are read
+        from the browser, instead of receiving the whole document at once.
+
+        :param options: keyword arguments for :py:func:`cdp.page.print_to_pdf`, eg: landscape=True
+        :return: async iterator of bytes
+        """
+        options["transfer_mode"] = "ReturnAsStream"
+        _, handle = await self.send(cdp.page.print_to_pdf(**options))
+        async for chunk in self.read_stream(handle):
+            yield chunk
+
+    async def save_pdf(self, filename: PathLike = "auto", **options) -> str:
+        """
+        prints the page as pdf, which is streamed straight to a file
+
+        :param filename: uses this as the save path. "auto" composes a name from the url.
+        :param options: keyword arguments for :py:func:`cdp.page.print_to_pdf`, eg: landscape=True
+        :return: the path/filename of the saved pdf
+        :rtype: str
+        """
+        import datetime
+        import urllib.parse
+
+        if not filename or filename == "auto":
+            parsed = urllib.parse.urlparse(self.target.url)
+            last_part = parsed.path.split("/")[-1]
+            dt_str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            path = pathlib.Path(f"{parsed.hostname}__{last_part}_{dt_str}.pdf")
+        else:
+            path = pathlib.Path(filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        options["transfer_mode"] = "ReturnAsStream"
+        _, handle = await self.send(cdp.page.print_to_pdf(**options))
+        await self.save_stream(handle, path)
         return str(path)
 
+    async def stream_response_body(
+        self, request_id: cdp.fetch.RequestId
+    ) -> typing.AsyncIterator[bytes]:
+        """
+        yields the body of an intercepted response in chunks.
+
+        the request must be paused by the fetch domain in the response stage (a
+        :py:obj:`cdp.fetch.RequestPaused` event having a response_status_code). afterwards, the request
+        can't be continued as is: it has to be fulfilled (with the body) or failed.
+
+        :param request_id: the request id of the paused request
+        :return: async iterator of bytes
+        """
+        handle = await self.send(cdp.fetch.take_response_body_as_stream(request_id))
+        async for chunk in self.read_stream(handle):
+            yield chunk
+
     async def set_download_path(self, path: Union[str, PathLike]):
         """
         sets the download path and allows downloads
@@ -1528,16 +1592,14 @@ class Tab(Connection):
         # there must be a better way...
         origin = "/".join(self.url.split("/", 3)[:-1])
 
-        await asyncio.gather(
-            *[
-                self.send(
-                    cdp.dom_storage.set_dom_storage_item(
-                        storage_id=cdp.dom_storage.StorageId(
-                            is_local_storage=True, security_origin=origin
-                        ),
-                        key=str(key),
-                        value=str(val),
-                    )
+        await self.send_many(
+            [
+                cdp.dom_storage.set_dom_storage_item(
+                    storage_id=cdp.dom_storage.StorageId(
+                        is_local_storage=True, security_origin=origin
+                    ),
+                    key=str(key),
+                    value=str(val),
                 )
                 for key, val in items.items()
             ]
@@ -0,0 +1,190 @@
+# Copyright 2024 by UltrafunkAmsterdam (https://github.com/UltrafunkAmsterdam)
+# All rights reserved.
+# This file is part of the nodriver package.
+# and is released under the "GNU AFFERO GENERAL PUBLIC LICENSE".
+# Please see the LICENSE.txt file that should have been included as part of this package.
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Union
+
+from .. import cdp
+
+if TYPE_CHECKING:
+    from .connection import Connection
+
+__all__ = ["TargetRegistry"]
+
+logger = logging.getLogger(__name__)
+
+
+class TargetRegistry:
+    """
+    the targets of a browser, indexed by target id and by type.
+
+    lookups, additions and removals by target id take constant time, which keeps the handling
+    of target events cheap when there are many targets (iframes, workers, popups).
+    the registry behaves like the list it replaced: it iterates in the order the targets were
+    added and supports len(), indexing, index(), append() and remove().
+
+    :py:attr:`tabs` and :py:attr:`main_tab` are cached, and only recomputed after a change.
+    """
+
+    def __init__(self):
+        # dicts keep insertion order, which is the order targets were created in
+        self._by_id: Dict[str, Connection] = {}
+        self._by_type: Dict[str, Dict[str, Connection]] = {}
+        self._list: Optional[List[Connection]] = None
+        self._tabs: Optional[List[Connection]] = None
+
+    def get(
+        self, target_id: str, default: Optional[Connection] = None
+    ) -> Optional[Connection]:
+        """
+        :return: the connection of the target with the given id, or default
+        """
+        return self._by_id.get(target_id, default)
+
+    def of_type(self, type_: str) -> List[Connection]:
+        """
+        :return: the connections of the targets of the given type ("page", "iframe", "service_worker", ...)
+        """
+        return list(self._by_type.get(type_, {}).values())
+
+    def add(self, connection: Connection) -> Connection:
+        """
+        adds the connection of a target. when the target id is known already,
+        the target info of the existing connection is updated instead.
+
+        :return: the connection which is registered for the target
+        """
+        existing = self._by_id.get(connection.target_id)
+        if existing is not None:
+            if existing is not connection:
+                self.update(connection.target)
+            return existing
+        self._by_id[connection.target_id] = connection
+        self._index(connection.target_id, connection.type_, connection)
+        self._changed()
+        return connection
+
+    append = add
+
+    def update(self, target_info: cdp.target.TargetInfo) -> Optional[Connection]:
+        """
+        updates the target info of a known target in place
+
+        :return: the connection of the target, or None when the target is unknown
+        """
+        connection = self._by_id.get(target_info.target_id)
+        if connection is None:
+            return None
+        current = connection.target
+        old_type = current.type_ if current is not None else None
+        if current is None:
+            connection._target = target_info
+        elif current is not target_info:
+            current.__dict__.update(target_info.__dict__)
+        if target_info.type_ != old_type:
+            # rare (e.g. a prerendered page being activated). the type index is
+            # rebuilt, so it stays in order of creation
+            self._unindex(target_info.target_id, old_type)
+            self._by_type[target_info.type_] = {
+                target_id: item
+                for target_id, item in self._by_id.items()
+                if item.type_ == target_info.type_
+            }
+            self._changed()
+        return connection
+
+    def discard(self, target_id: str) -> Optional[Connection]:
+        """
+        removes a target
+
+        :return: the connection of the removed target, or None when the target is unknown
+        """
+        connection = self._by_id.pop(target_id, None)
+        if connection is not None:
+            self._unindex(target_id, connection.type_)
+            self._changed()
+        return connection
+
+    def remove(self, connection: Connection):
+        """
+        removes the connection of a target.
+        like list.remove, ValueError is raised when it is not registered.
+        """
+        if self._by_id.get(connection.target_id) is not connection:
+            raise ValueError("%s is not registered" % connection)
+        self.discard(connection.target_id)
+
+    def index(self, connection: Connection) -> int:
+        return self._values().index(connection)
+
+    def clear(self):
+        self._by_id.clear()
+        self._by_type.clear()
+        self._changed()
+
+    @property
+    def tabs(self) -> List[Connection]:
+        """the targets of type "page", in order of creation"""
+        if self._tabs is None:
+            self._tabs = self.of_type("page")
+        # a copy, so callers can't corrupt the cache
+        return list(self._tabs)
+
+    @property
+    def main_tab(self) -> Optional[Connection]:
+        """the first page, or the first target when there are no pages"""
+        if self._tabs is None:
+            self._tabs = self.of_type("page")
+        if self._tabs:
+            return self._tabs[0]
+        return next(iter(self._by_id.values()), None)
+
+    def _index(self, target_id: str, type_: str, connection: Connection):
+        self._by_type.setdefault(type_, {})[target_id] = connection
+
+    def _unindex(self, target_id: str, type_: str):
+        of_type = self._by_type.get(type_)
+        if of_type is not None:
+            of_type.pop(target_id, None)
+            if not of_type:
+                del self._by_type[type_]
+
+    def _changed(self):
+        self._list = None
+        self._tabs = None
+
+    def _values(self) -> List[Connection]:
+        if self._list is None:
+            self._list = list(self._by_id.values())
+        return self._list
+
+    def __contains__(self, item: Union[str, Connection]) -> bool:
+        if isinstance(item, str):
+            return item in self._by_id
+        return self._by_id.get(getattr(item, "target_id", None)) is item
+
+    def __getitem__(
+        self, item: Union[int, slice]
+    ) -> Union[Connection, List[Connection]]:
+        return self._values()[item]
+
+    def __iter__(self) -> Iterator[Connection]:
+        # iterate over a snapshot, the registry may change while iterating
+        return iter(self._values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __bool__(self) -> bool:
+        return bool(self._by_id)
+
+    def __repr__(self):
+        types = ", ".join(
+            "%s: %d" % (type_, len(of_type)) for type_, of_type in self._by_type.items()
+        )
+        return f"<{self.__class__.__name__} ({types})>"
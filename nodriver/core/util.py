@@ -378,6 +378,28 @@ def loop():
     return loop
 
 
+def write_base64(path: PathLike, data: str, chunk_size: int = 2**20) -> int:
+    """
+    decodes base64 data and writes it to a file in chunks,
+    so the decoded data is never held in memory as a whole
+
+    :param path: the file to write
+    :param data: base64 encoded data
+    :param chunk_size: number of base64 characters to decode at a time.
+        rounded down to a multiple of 4, with a minimum of 4.
+    :return: the number of bytes written
+    """
+    import base64
+
+    # a multiple of 4 characters always decodes to whole bytes
+    chunk_size = max(4, chunk_size - chunk_size % 4)
+    written = 0
+    with open(path, "wb") as file:
+        for offset in range(0, len(data), chunk_size):
+            written += file.write(base64.b64decode(data[offset : offset + chunk_size]))
+    return written
+
+
 def cdp_get_module(domain: Union[str, types.ModuleType]):
     """
     get cdp module by given string
@@ -0,0 +1,553 @@
+# Copyright 2024 by UltrafunkAmsterdam (https://github.com/UltrafunkAmsterdam)
+# All rights reserved.
+# This file is part of the nodriver package.
+# and is released under the "GNU AFFERO GENERAL PUBLIC LICENSE".
+# Please see the LICENSE.txt file that should have been included as part of this package.
+
+"""
+a small in-process server which speaks enough of the chrome devtools protocol to run nodriver
+against it, without a browser. it is meant for load testing and benchmarking the client side:
+connections, target discovery and event dispatching.
+
+.. code-block::
+
+    async with MockCDPServer(pages=2) as server:
+        browser = await nodriver.start(
+            host=server.host, port=server.port, browser_executable_path="/bin/true"
+        )
+        tab = browser.main_tab
+        tab.add_handler(cdp.network.DataReceived, on_data)
+        await tab.send(cdp.network.enable())
+        await server.storm(
+            "Network.dataReceived",
+            data_received,
+            rate=10_000,
+            count=50_000,
+            target_id=tab.target_id,
+        )
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import time
+import urllib.parse
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+from websockets.http11 import Request, Response
+
+__all__ = ["MockCDPServer", "MockClient"]
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = "1.3"
+PRODUCT = "HeadlessChrome/130.0.0.0 (nodriver mock)"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) HeadlessChrome/130.0.0.0 Safari/537.36"
+
+# a scripted response: either the result dict, or a (coroutine) function which
+# is called as response(params, client, session_id) and returns the result dict
+ScriptedResponse = Union[dict, Callable[[dict, "MockClient", Optional[str]], Any]]
+# event params, or a function which is called as params(i) for the i-th event of a storm
+EventParams = Union[dict, Callable[[int], dict]]
+
+
+class MockClient:
+    """
+    a websocket connected to the server. either the browser endpoint
+    (target_id is None), or the endpoint of a single target.
+    """
+
+    def __init__(self, websocket: ServerConnection, target_id: str = None):
+        self.websocket = websocket
+        self.target_id = target_id
+        self.discover_targets = False
+        self.sessions: Dict[str, str] = {}  # session_id => target_id
+
+    async def send(self, message: Union[str, dict]):
+        if isinstance(message, dict):
+            message = json.dumps(message)
+        try:
+            await self.websocket.send(message)
+        except ConnectionClosed:
+            pass
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.target_id or 'browser'} sessions: {len(self.sessions)}>"
+
+
+class MockCDPServer:
+    """
+    a mock chrome devtools endpoint.
+
+    it serves /json/version and /json (the http endpoints used to discover the browser and its targets),
+    the browser websocket and a websocket per target. commands it knows are answered the way chrome
+    would (Target.*, Browser.getVersion and the like), unknown commands are answered with an empty
+    result, or with an error when strict is set. responses can be scripted using :py:meth:`set_response`,
+    events using :py:meth:`add_event`, :py:meth:`emit` and :py:meth:`storm`.
+
+    flattened sessions (Target.attachToTarget(flatten=True)) are supported, so events for a target are
+    delivered to the target websocket(s) as well as to the sessions attached to it.
+    """
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, pages: int = 1, strict=False
+    ):
+        """
+        :param host: the host to listen on
+        :param port: the port to listen on. 0 picks a free port.
+        :param pages: number of page targets to create initially
+        :param strict: when set to True, unknown commands are answered with a "method not found" error
+        """
+        self.host = host
+        self.port = port
+        self.strict = strict
+        self.browser_id = str(uuid.uuid4())
+        self.targets: Dict[str, dict] = {}
+        self.clients: List[MockClient] = []
+        self.received: List[dict] = []
+        self.record = True
+        self._responses: Dict[str, ScriptedResponse] = {}
+        self._events: Dict[str, List[tuple]] = {}
+        self._session_ids = itertools.count(1)
+        self._server = None
+        for _ in range(pages):
+            self.add_target()
+
+    @property
+    def websocket_url(self) -> str:
+        """the websocket url of the browser endpoint"""
+        return f"ws://{self.host}:{self.port}/devtools/browser/{self.browser_id}"
+
+    async def start(self) -> MockCDPServer:
+        self._server = await serve(
+            self._handler,
+            self.host,
+            self.port,
+            process_request=self._process_request,
+            max_size=2**28,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.debug("mock cdp server listening on %s:%d", self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def set_response(self, method: str, response: ScriptedResponse):
+        """
+        script the response to a command
+
+        :param method: eg: "Runtime.evaluate"
+        :param response: the result dict, or a (coroutine) function which is called as
+            response(params, client, session_id) and returns the result. raise a ValueError
+            from it to answer with an error instead.
+        """
+        self._responses[method] = response
+
+    def set_error(self, method: str, message: str, code: int = -32000):
+        """
+        answer a command with an error
+        """
+
+        def error(params, client, session_id):
+            raise ValueError(code, message)
+
+        self._responses[method] = error
+
+    def add_event(self, after: str, method: str, params: EventParams = None):
+        """
+        emit an event every time after a command is answered. the event is sent to the
+        same websocket (and session) as the response.
+
+        :param after: method of the command, eg: "Page.navigate"
+        :param method: method of the event, eg: "Page.loadEventFired"
+        :param params: params of the event
+        """
+        self._events.setdefault(after, []).append((method, params or {}))
+
+    def add_target(
+        self, url: str = "about:blank", type_: str = "page", title: str = None
+    ) -> str:
+        """
+        add a target and notify the clients which discover targets
+
+        :return: the target id
+        """
+        target_id = uuid.uuid4().hex.upper()
+        self.targets[target_id] = {
+            "targetId": target_id,
+            "type": type_,
+            "title": title if title is not None else url,
+            "url": url,
+            "attached": False,
+            "canAccessOpener": False,
+            "browserContextId": self.browser_id,
+        }
+        self._notify("Target.targetCreated", {"targetInfo": self.targets[target_id]})
+        return target_id
+
+    def remove_target(self, target_id: str):
+        """
+        remove a target, notify the clients which discover targets
+        and close its websocket(s) and sessions
+        """
+        if self.targets.pop(target_id, None) is None:
+            return
+        self._notify("Target.targetDestroyed", {"targetId": target_id})
+        for client in list(self.clients):
+            if client.target_id == target_id:
+                asyncio.ensure_future(client.websocket.close())
+            for session_id, session_target in list(client.sessions.items()):
+                if session_target == target_id:
+                    del client.sessions[session_id]
+                    self._schedule(
+                        client,
+                        {
+                            "method": "Target.detachedFromTarget",
+                            "params": {"sessionId": session_id, "targetId": target_id},
+                        },
+                    )
+
+    async def emit(
+        self, method: str, params: dict = None, target_id: str = None
+    ) -> int:
+        """
+        send an event
+
+        :param method: method of the event, eg: "Network.dataReceived"
+        :param params: params of the event
+        :param target_id: send the event to the websocket(s) and sessions of this target.
+            when omitted, the event is sent to the browser websocket(s).
+        :return: the number of websockets the event was sent to
+        """
+        messages = self._route(method, params or {}, target_id)
+        await asyncio.gather(*(client.send(message) for client, message in messages))
+        return len(messages)
+
+    async def storm(
+        self,
+        method: str,
+        params: EventParams = None,
+        rate: float = 1000,
+        count: int = None,
+        duration: float = None,
+        target_id: str = None,
+    ) -> int:
+        """
+        send a stream of events at a given rate
+
+        :param method: method of the event, eg: "Network.dataReceived"
+        :param params: params of the events, or a function which is called as params(i)
+            for every event. constant params are encoded only once.
+        :param rate: events per second. None sends as fast as possible.
+        :param count: number of events to send
+        :param duration: number of seconds to send events. either count or duration is required.
+        :param target_id: see :py:meth:`emit`
+        :return: the number of events sent
+        """
+        if count is None and duration is None:
+            raise ValueError("either count or duration is required")
+        interval = 0.01
+        per_tick = max(1, int(rate * interval)) if rate else 1000
+        static = None
+        if not callable(params):
+            static = self._route(method, params or {}, target_id)
+        started = time.monotonic()
+        sent = 0
+        while count is None or sent < count:
+            if duration is not None and time.monotonic() - started >= duration:
+                break
+            batch = per_tick if count is None else min(per_tick, count - sent)
+            for i in range(sent, sent + batch):
+                messages = static or self._route(method, params(i), target_id)
+                for client, message in messages:
+                    await client.send(message)
+            sent += batch
+            if rate:
+                # keep the average rate, regardless of how long sending took
+                delay = started + sent / rate - time.monotonic()
+                await asyncio.sleep(max(delay, 0))
+            else:
+                await asyncio.sleep(0)
+        return sent
+
+    def _route(self, method: str, params: dict, target_id: str = None) -> List[tuple]:
+        """
+        :return: list of (client, encoded message) to deliver an event to
+        """
+        messages = []
+        plain = None
+        for client in self.clients:
+            if client.target_id == target_id:
+                if plain is None:
+                    plain = json.dumps({"method": method, "params": params})
+                messages.append((client, plain))
+            if target_id is None:
+                continue
+            for session_id, session_target in client.sessions.items():
+                if session_target == target_id:
+                    messages.append(
+                        (
+                            client,
+                            json.dumps(
+                                {
+                                    "method": method,
+                                    "params": params,
+                                    "sessionId": session_id,
+                                }
+                            ),
+                        )
+                    )
+        return messages
+
+    def _notify(self, method: str, params: dict):
+        """
+        sends a Target.* event to the clients which discover targets
+        """
+        for client in self.clients:
+            if client.discover_targets:
+                self._schedule(client, {"method": method, "params": params})
+
+    @staticmethod
+    def _schedule(client: MockClient, message: dict):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # not started yet, nobody to notify
+            return
+        asyncio.ensure_future(client.send(message))
+
+    def _process_request(self, connection: ServerConnection, request: Request):
+        """
+        answers the http endpoints. websocket handshakes are passed on.
+        """
+        url = urllib.parse.urlsplit(request.path)
+        path = url.path.rstrip("/")
+        if path.startswith("/devtools/"):
+            return None
+        if path == "/json/version":
+            body = {
+                "Browser": PRODUCT,
+                "Protocol-Version": PROTOCOL_VERSION,
+                "User-Agent": USER_AGENT,
+                "V8-Version": "13.0.0",
+                "WebKit-Version": "537.36",
+                "webSocketDebuggerUrl": self.websocket_url,
+            }
+        elif path in ("/json", "/json/list"):
+            body = [self._describe(target) for target in self.targets.values()]
+        elif path == "/json/new":
+            target_id = self.add_target(
+                urllib.parse.unquote(url.query) or "about:blank"
+            )
+            body = self._describe(self.targets[target_id])
+        elif path.startswith("/json/close/"):
+            self.remove_target(path.rsplit("/", 1)[-1])
+            return self._respond(connection, "Target is closing", "text/plain")
+        elif path.startswith("/json/activate/"):
+            return self._respond(connection, "Target activated", "text/plain")
+        else:
+            return connection.respond(404, "not found\n")
+        return self._respond(connection, json.dumps(body))
+
+    @staticmethod
+    def _respond(
+        connection: ServerConnection, body: str, content_type="application/json"
+    ) -> Response:
+        response = connection.respond(200, body)
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = "%s; charset=UTF-8" % content_type
+        return response
+
+    def _describe(self, target: dict) -> dict:
+        ws = f"{self.host}:{self.port}/devtools/page/{target['targetId']}"
+        return {
+            "description": "",
+            "devtoolsFrontendUrl": f"/devtools/inspector.html?ws={ws}",
+            "id": target["targetId"],
+            "title": target["title"],
+            "type": target["type"],
+            "url": target["url"],
+            "webSocketDebuggerUrl": f"ws://{ws}",
+        }
+
+    async def _handler(self, websocket: ServerConnection):
+        path = urllib.parse.urlsplit(websocket.request.path).path
+        target_id = None
+        if path.startswith("/devtools/page/"):
+            target_id = path.rsplit("/", 1)[-1]
+            if target_id not in self.targets:
+                await websocket.close(1011, "no such target")
+                return
+        client = MockClient(websocket, target_id)
+        self.clients.append(client)
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                if self.record:
+                    self.received.append(message)
+                await self._answer(client, message)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.clients.remove(client)
+
+    async def _answer(self, client: MockClient, message: dict):
+        method = message.get("method")
+        session_id = message.get("sessionId")
+        reply = {"id": message.get("id")}
+        if session_id is not None:
+            reply["sessionId"] = session_id
+        try:
+            if session_id is not None and session_id not in client.sessions:
+                raise ValueError(-32001, "Session with given id not found.")
+            response = self._responses.get(method)
+            if response is None:
+                response = getattr(self, "_" + method.replace(".", "_"), None)
+            if response is None:
+                if self.strict:
+                    raise ValueError(-32601, "'%s' wasn't found" % method)
+                result = {}
+            elif callable(response):
+                result = response(message.get("params", {}), client, session_id)
+                if inspect.isawaitable(result):
+                    result = await result
+            else:
+                result = response
+            reply["result"] = result if result is not None else {}
+        except ValueError as e:
+            code, text = e.args if len(e.args) == 2 else (-32000, str(e))
+            reply["error"] = {"code": code, "message": text}
+        await client.send(reply)
+        for event_method, params in self._events.get(method, ()):
+            event = {"method": event_method, "params": params}
+            if session_id is not None:
+                event["sessionId"] = session_id
+            await client.send(event)
+
+    # built-in responses. they are called as response(params, client, session_id)
+
+    def _Browser_getVersion(self, params, client, session_id):
+        return {
+            "protocolVersion": PROTOCOL_VERSION,
+            "product": PRODUCT,
+            "revision": "@0",
+            "userAgent": USER_AGENT,
+            "jsVersion": "13.0.0",
+        }
+
+    def _Target_getTargets(self, params, client, session_id):
+        return {"targetInfos": list(self.targets.values())}
+
+    def _Target_getTargetInfo(self, params, client, session_id):
+        target_id = params.get("targetId") or client.target_id
+        if target_id not in self.targets:
+            raise ValueError(-32602, "No target with given id found")
+        return {"targetInfo": self.targets[target_id]}
+
+    def _Target_setDiscoverTargets(self, params, client, session_id):
+        client.discover_targets = params.get("discover", False)
+        if client.discover_targets:
+            for target in self.targets.values():
+                self._schedule(
+                    client,
+                    {
+                        "method": "Target.targetCreated",
+                        "params": {"targetInfo": target},
+                    },
+                )
+        return {}
+
+    def _Target_createTarget(self, params, client, session_id):
+        return {"targetId": self.add_target(params.get("url", "about:blank"))}
+
+    def _Target_closeTarget(self, params, client, session_id):
+        if params.get("targetId") not in self.targets:
+            raise ValueError(-32602, "No target with given id found")
+        self.remove_target(params["targetId"])
+        return {"success": True}
+
+    def _Target_attachToTarget(self, params, client, session_id):
+        target_id = params.get("targetId")
+        if target_id not in self.targets:
+            raise ValueError(-32602, "No target with given id found")
+        if not params.get("flatten"):
+            raise ValueError(-32000, "only flattened sessions are supported")
+        new_session_id = "%032X" % next(self._session_ids)
+        client.sessions[new_session_id] = target_id
+        self._schedule(
+            client,
+            {
+                "method": "Target.attachedToTarget",
+                "params": {
+                    "sessionId": new_session_id,
+                    "targetInfo": {**self.targets[target_id], "attached": True},
+                    "waitingForDebugger": False,
+                },
+            },
+        )
+        return {"sessionId": new_session_id}
+
+    def _Target_detachFromTarget(self, params, client, session_id):
+        detached = params.get("sessionId")
+        target_id = client.sessions.pop(detached, None)
+        if target_id is None:
+            raise ValueError(-32602, "No session with given id found")
+        self._schedule(
+            client,
+            {
+                "method": "Target.detachedFromTarget",
+                "params": {"sessionId": detached, "targetId": target_id},
+            },
+        )
+        return {}
+
+    def _Page_navigate(self, params, client, session_id):
+        target_id = client.sessions.get(session_id) or client.target_id
+        target = self.targets.get(target_id)
+        if target is not None:
+            target["url"] = target["title"] = params.get("url", "about:blank")
+            self._notify("Target.targetInfoChanged", {"targetInfo": target})
+        return {"frameId": target_id or "", "loaderId": uuid.uuid4().hex.upper()}
+
+    def _Runtime_evaluate(self, params, client, session_id):
+        return {"result": {"type": "undefined"}}
+
+    def _DOM_getDocument(self, params, client, session_id):
+        return {
+            "root": {
+                "nodeId": 1,
+                "backendNodeId": 1,
+                "nodeType": 9,
+                "nodeName": "#document",
+                "localName": "",
+                "nodeValue": "",
+                "childNodeCount": 0,
+                "children": [],
+                "documentURL": "about:blank",
+                "baseURL": "about:blank",
+                "xmlVersion": "",
+            }
+        }
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} {self.host}:{self.port} "
+            f"targets: {len(self.targets)} clients: {len(self.clients)}>"
+        )
@@ -0,0 +1,54 @@
+import asyncio
+import contextlib
+import inspect
+import sys
+import pathlib
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from nodriver.core.connection import Connection  # noqa: E402
+from nodriver.testing import MockCDPServer  # noqa: E402
+
+# a test which hangs fails after this many seconds
+TEST_TIMEOUT = 20
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """
+    runs coroutine test functions in an event loop of their own
+    """
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    kwargs = {
+        name: pyfuncitem.funcargs[name]
+        for name in pyfuncitem._fixtureinfo.argnames  # noqa
+    }
+    asyncio.run(asyncio.wait_for(pyfuncitem.obj(**kwargs), TEST_TIMEOUT))
+    return True
+
+
+@contextlib.asynccontextmanager
+async def _mock_target(pages: int = 1, **options):
+    async with MockCDPServer(pages=pages) as server:
+        target_id = next(iter(server.targets))
+        connection = Connection(
+            f"ws://{server.host}:{server.port}/devtools/page/{target_id}", **options
+        )
+        await connection.connect()
+        try:
+            yield server, connection
+        finally:
+            await connection.disconnect()
+
+
+@pytest.fixture
+def mock_target():
+    """
+    async context manager which starts a mock server and yields (server, connection),
+    the connection being a connection to the websocket of its first page.
+    keyword arguments are set on the connection.
+    """
+    return _mock_target
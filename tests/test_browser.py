@@ -0,0 +1,54 @@
+import asyncio
+import logging
+
+import pytest
+
+import nodriver
+from nodriver import cdp
+from nodriver.core import connection as connection_module
+from nodriver.core.connection import ProtocolException
+from nodriver.testing import MockCDPServer
+
+
+async def start(server, **options):
+    return await nodriver.start(
+        host=server.host,
+        port=server.port,
+        browser_executable_path="/bin/true",
+        **options,
+    )
+
+
+async def test_stop_does_not_reconnect(monkeypatch, caplog):
+    monkeypatch.setattr(connection_module, "RECONNECT_DELAY", 0.01)
+    caplog.set_level(logging.INFO, logger=connection_module.__name__)
+    async with MockCDPServer(pages=2) as server:
+        browser = await start(server, auto_reconnect=True)
+        for tab in browser.tabs:
+            await tab.send(cdp.runtime.evaluate("1"))
+        browser.stop()
+    # the server closed all websockets
+    await asyncio.sleep(0.1)
+    assert "reconnecting" not in caplog.text
+    assert all(tab.closed for tab in browser.tabs)
+
+
+async def test_destroyed_target_fails_pending():
+    async with MockCDPServer() as server:
+        browser = await start(server)
+        tab = browser.main_tab
+        answer = asyncio.Event()
+
+        async def later(params, client, session_id):
+            await answer.wait()
+
+        server.set_response("Runtime.evaluate", later)
+        pending = asyncio.ensure_future(tab.send(cdp.runtime.evaluate("1")))
+        await asyncio.sleep(0.05)
+        await server.emit("Target.targetDestroyed", {"targetId": tab.target_id})
+        try:
+            with pytest.raises(ProtocolException):
+                await asyncio.wait_for(pending, 5)
+        finally:
+            answer.set()
+            browser.stop()
@@ -0,0 +1,35 @@
+import pytest
+
+from nodriver import cdp
+from nodriver.core.connection import (
+    Connection,
+    ProtocolException,
+    Transaction,
+    get_codec,
+)
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson"])
+async def test_lone_surrogates(mock_target, codec):
+    try:
+        codec = get_codec(codec)
+    except ValueError:
+        pytest.skip("%s is not installed" % codec)
+    async with mock_target(codec=codec) as (server, connection):
+        # chrome escapes lone surrogates as \\udXXX, which is what json.dumps does as well
+        server.set_response(
+            "Runtime.evaluate", {"result": {"type": "string", "value": "\ud800!"}}
+        )
+        remote_object, _ = await connection.send(cdp.runtime.evaluate("1"))
+        assert remote_object.value == "\ud800!"
+
+
+async def test_undecodable_response_fails_transaction():
+    connection = Connection(None)
+    tx = Transaction(cdp.runtime.evaluate("1"))
+    tx.id = 5
+    connection.mapper[tx.id] = tx
+    await connection._receive(b'{"id":5,"result":{"type":')
+    assert 5 not in connection.mapper
+    with pytest.raises(ProtocolException):
+        tx.result()
@@ -0,0 +1,64 @@
+import asyncio
+
+from nodriver import cdp
+
+
+def methods(server, domain):
+    return [
+        message["method"]
+        for message in server.received
+        if message["method"].startswith(domain + ".")
+    ]
+
+
+async def settle(connection):
+    # domains are disabled in the background after the last handler is removed
+    await connection.send(cdp.runtime.evaluate("1"))
+    await asyncio.sleep(0.01)
+
+
+async def test_handlers_enable_and_disable_domain(mock_target):
+    async with mock_target() as (server, connection):
+        handler = connection.add_handler(cdp.network.DataReceived, lambda event: None)
+        await settle(connection)
+        connection.remove_handler(cdp.network.DataReceived, handler)
+        await settle(connection)
+        assert methods(server, "Network") == ["Network.enable", "Network.disable"]
+
+
+async def test_explicitly_enabled_domain_stays_enabled(mock_target):
+    async with mock_target() as (server, connection):
+        await connection.send(cdp.network.enable(max_total_buffer_size=1000))
+        handler = connection.add_handler(cdp.network.DataReceived, lambda event: None)
+        await settle(connection)
+        connection.remove_handler(cdp.network.DataReceived, handler)
+        await settle(connection)
+        # only the explicit command, with its options
+        assert methods(server, "Network") == ["Network.enable"]
+        assert server.received[0]["params"] == {"maxTotalBufferSize": 1000}
+
+
+async def test_explicit_enable_after_handler(mock_target):
+    async with mock_target() as (server, connection):
+        handler = connection.add_handler(cdp.page.LoadEventFired, lambda event: None)
+        await settle(connection)
+        await connection.send(cdp.page.enable())
+        connection.remove_handler(cdp.page.LoadEventFired, handler)
+        await settle(connection)
+        assert methods(server, "Page") == ["Page.enable", "Page.enable"]
+
+
+async def test_disable_goes_before_next_send(mock_target):
+    async with mock_target() as (server, connection):
+        handler = connection.add_handler(cdp.network.DataReceived, lambda event: None)
+        await settle(connection)
+        server.received.clear()
+        connection.remove_handler(cdp.network.DataReceived, handler)
+        task = connection._register_task
+        assert task is not None
+        await connection.send(cdp.runtime.evaluate("1"))
+        assert [message["method"] for message in server.received] == [
+            "Network.disable",
+            "Runtime.evaluate",
+        ]
+        assert task.done() and connection._register_task is None
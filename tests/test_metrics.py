@@ -0,0 +1,22 @@
+from nodriver import cdp
+from nodriver.core.connection import Connection, get_codec
+
+
+async def test_bytes_are_counted_in_bytes():
+    connection = Connection(None, codec=get_codec("json"))
+    metrics = connection.enable_metrics(lag_interval=None)
+    frame = '{"method":"Runtime.consoleAPICalled","params":{"text":"é中"}}'
+    await connection._receive(frame)
+    assert metrics.frames_in == 1
+    assert metrics.bytes_in == len(frame.encode()) == len(frame) + 3
+
+
+async def test_command_metrics(mock_target):
+    async with mock_target() as (server, connection):
+        metrics = connection.enable_metrics(lag_interval=None)
+        await connection.send(cdp.runtime.evaluate("1"))
+        snapshot = metrics.snapshot()
+        assert snapshot["commands"]["Runtime.evaluate"]["count"] == 1
+        assert snapshot["frames_out"] == 1
+        assert snapshot["bytes_out"] > 0
+        connection.disable_metrics()
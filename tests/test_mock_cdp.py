@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from nodriver import cdp
+from nodriver.core.connection import ProtocolException
+
+
+async def test_storm_reaches_the_target(mock_target):
+    async with mock_target() as (server, connection):
+        target_id = next(iter(server.targets))
+        received = []
+        connection.add_handler(
+            cdp.page.FrameStoppedLoading,
+            lambda event: received.append(event.frame_id),
+        )
+        await connection.send(cdp.page.enable())
+        sent = await server.storm(
+            "Page.frameStoppedLoading",
+            lambda i: {"frameId": str(i)},
+            rate=None,
+            count=50,
+            target_id=target_id,
+        )
+        assert sent == 50
+        while len(received) < 50:
+            await asyncio.sleep(0.01)
+        assert received == [str(i) for i in range(50)]
+
+
+async def test_scripted_responses_and_events(mock_target):
+    async with mock_target() as (server, connection):
+        loaded = []
+        connection.add_handler(cdp.page.LoadEventFired, loaded.append)
+        server.set_response(
+            "Runtime.evaluate", {"result": {"type": "number", "value": 2}}
+        )
+        server.add_event("Page.navigate", "Page.loadEventFired", {"timestamp": 1.0})
+        server.set_error("DOM.focus", "no node")
+        result, _ = await connection.send(cdp.runtime.evaluate("1 + 1"))
+        assert result.value == 2
+        await connection.send(cdp.page.navigate("https://example.com"))
+        while not loaded:
+            await asyncio.sleep(0.01)
+        assert loaded[0].timestamp == 1.0
+        with pytest.raises(ProtocolException, match="no node"):
+            await connection.send(cdp.dom.focus(node_id=cdp.dom.NodeId(1)))
+        assert "Runtime.evaluate" in [message["method"] for message in server.received]
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from nodriver import Config
+from nodriver.core import pool as pool_module
+from nodriver.core import util
+from nodriver.core.pool import BrowserPool
+from nodriver.testing import MockCDPServer
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(pool_module, "LAUNCH_RETRY_DELAY", 0.01)
+
+
+def config_factory(server, failures=()):
+    """
+    :param failures: numbers of the launches (counting from 1) which fail
+    """
+    launches = 0
+
+    def factory():
+        nonlocal launches
+        launches += 1
+        if launches in failures:
+            raise RuntimeError("launch %d failed" % launches)
+        return Config(
+            host=server.host, port=server.port, browser_executable_path="/bin/true"
+        )
+
+    return factory
+
+
+def counts(pool):
+    return pool.idle + pool.leased + pool.launching
+
+
+async def test_retired_browsers_are_unregistered():
+    async with MockCDPServer() as server:
+        async with BrowserPool(1, config_factory(server), max_uses=1) as pool:
+            browser = await pool.acquire()
+            assert browser in util.get_registered_instances()
+            await pool.release(browser)
+            assert browser not in util.get_registered_instances()
+            await pool.release(await pool.acquire())
+
+
+async def test_failed_replacement_is_retried():
+    async with MockCDPServer() as server:
+        factory = config_factory(server, failures=(2, 3))
+        async with BrowserPool(1, factory, max_uses=1) as pool:
+            first = await pool.acquire()
+            await pool.release(first)
+            assert counts(pool) == 1
+            # the pool is empty while failing, which is raised to the caller
+            with pytest.raises(RuntimeError, match="launch [23] failed"):
+                await pool.acquire(timeout=5)
+            assert counts(pool) == 1
+            while not pool.idle:
+                await asyncio.sleep(0.01)
+            second = await pool.acquire(timeout=5)
+            assert second is not first
+            assert counts(pool) == 1
+            await pool.release(second)
+
+
+async def test_failed_start_stops_launched_browsers():
+    async with MockCDPServer() as server:
+        pool = BrowserPool(2, config_factory(server, failures=(2,)))
+        with pytest.raises(RuntimeError, match="launch 2 failed"):
+            await pool.start()
+        assert pool.idle == 0
+        with pytest.raises(RuntimeError, match="closed"):
+            await pool.acquire()
+
+
+async def test_close_wakes_waiting_callers():
+    async with MockCDPServer() as server:
+        pool = await BrowserPool(1, config_factory(server)).start()
+        browser = await pool.acquire()
+        waiting = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        await pool.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            await asyncio.wait_for(waiting, 5)
+        await pool.release(browser)
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from nodriver import cdp
+from nodriver.core import connection as connection_module
+from nodriver.core.connection import ProtocolException
+
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(connection_module, "RECONNECT_DELAY", 0.01)
+
+
+def drop_first_call(server, method):
+    """
+    the first call of method closes the websocket it was received on, instead of answering
+    """
+    calls = []
+
+    async def respond(params, client, session_id):
+        calls.append(params)
+        if len(calls) == 1:
+            await client.websocket.close()
+        return {"result": {"type": "undefined"}}
+
+    server.set_response(method, respond)
+    return calls
+
+
+async def test_reconnect_retries_pending(mock_target):
+    async with mock_target(auto_reconnect=True, retry_pending=True) as (
+        server,
+        connection,
+    ):
+        connection.add_handler(cdp.network.DataReceived, lambda event: None)
+        calls = drop_first_call(server, "Runtime.evaluate")
+        result = await connection.send(cdp.runtime.evaluate("1"))
+        assert result[0].type_ == "undefined"
+        assert len(calls) == 2
+        assert not connection.closed
+        # the domain was enabled again on the new websocket
+        methods = [message["method"] for message in server.received]
+        assert methods.count("Network.enable") == 2
+
+
+async def test_reconnect_fails_pending(mock_target):
+    async with mock_target(auto_reconnect=True) as (server, connection):
+        calls = drop_first_call(server, "Runtime.evaluate")
+        with pytest.raises(ProtocolException):
+            await connection.send(cdp.runtime.evaluate("1"))
+        # the next command reconnects, or waits for the reconnect
+        for _ in range(100):
+            if not connection.closed:
+                break
+            await asyncio.sleep(0.01)
+        await connection.send(cdp.runtime.evaluate("1"))
+        assert len(calls) == 2
+
+
+async def wait_for_reconnect(connection):
+    while connection._reconnected is None:
+        await asyncio.sleep(0.01)
+
+
+async def test_send_while_reconnecting(mock_target, monkeypatch):
+    monkeypatch.setattr(connection_module, "RECONNECT_DELAY", 0.2)
+    async with mock_target(auto_reconnect=True, retry_pending=True) as (
+        server,
+        connection,
+    ):
+        calls = drop_first_call(server, "Runtime.evaluate")
+        first = asyncio.ensure_future(connection.send(cdp.runtime.evaluate("first")))
+        await wait_for_reconnect(connection)
+        await connection.send(cdp.runtime.evaluate("second"))
+        await first
+        # the command which was in flight is sent again once, ahead of the new one
+        expressions = [params["expression"] for params in calls]
+        assert expressions == ["first", "first", "second"]
+
+
+async def test_closing_while_reconnecting_fails_pending(mock_target, monkeypatch):
+    monkeypatch.setattr(connection_module, "RECONNECT_DELAY", 0.2)
+    async with mock_target(auto_reconnect=True, retry_pending=True) as (
+        server,
+        connection,
+    ):
+        drop_first_call(server, "Runtime.evaluate")
+        pending = asyncio.ensure_future(connection.send(cdp.runtime.evaluate("1")))
+        await wait_for_reconnect(connection)
+        connection._closing = True
+        with pytest.raises(ProtocolException):
+            await pending
+        assert not connection.mapper
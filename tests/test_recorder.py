@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from nodriver import cdp
+from nodriver.core.connection import Connection
+from nodriver.core.recorder import OUTGOING, Replayer
+
+MAGIC = {".gz": b"\x1f\x8b", ".xz": b"\xfd7zXZ"}
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".xz"])
+async def test_record_and_replay(mock_target, tmp_path, suffix):
+    path = tmp_path / ("session.jsonl" + suffix)
+    async with mock_target() as (server, connection):
+        target_id = next(iter(server.targets))
+        live = []
+        connection.add_handler(
+            cdp.page.FrameStoppedLoading, lambda event: live.append(event.frame_id)
+        )
+        recorder = connection.start_recording(path)
+        await connection.send(cdp.page.enable())
+        await server.storm(
+            "Page.frameStoppedLoading",
+            lambda i: {"frameId": str(i)},
+            rate=None,
+            count=20,
+            target_id=target_id,
+        )
+        await connection.send(cdp.runtime.evaluate("1"))
+        while len(live) < 20:
+            await asyncio.sleep(0.01)
+        connection.stop_recording()
+    assert recorder.closed
+    assert path.read_bytes().startswith(MAGIC[suffix])
+
+    replayer = Replayer(path)
+    commands = [json.loads(data)["method"] for _, _, data in replayer.frames(OUTGOING)]
+    assert commands == ["Page.enable", "Runtime.evaluate"]
+
+    replayed = []
+    offline = Connection(None)
+    offline.add_handler(
+        cdp.page.FrameStoppedLoading, lambda event: replayed.append(event.frame_id)
+    )
+    # 20 events and 2 responses
+    assert await replayer.replay(offline) == 22
+    assert replayed == live == [str(i) for i in range(20)]
+
+
+def test_compression_level(tmp_path):
+    sizes = {}
+    frame = json.dumps({"method": "Network.dataReceived", "params": {"x": "a" * 50}})
+    for level in (0, 9):
+        path = tmp_path / ("level%d.jsonl.gz" % level)
+        connection = Connection(None)
+        with connection.start_recording(path, level=level) as recorder:
+            for _ in range(200):
+                recorder.record("in", frame)
+        connection.stop_recording()
+        sizes[level] = path.stat().st_size
+        assert len(list(Replayer(path).frames())) == 200
+    assert sizes[9] < sizes[0]
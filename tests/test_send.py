@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from nodriver import cdp
+from nodriver.core.connection import ProtocolException
+
+
+def methods(server):
+    return [message["method"] for message in server.received]
+
+
+async def test_send_many_keeps_order(mock_target):
+    async with mock_target() as (server, connection):
+        server.received.clear()
+        await connection.send_many(
+            [
+                cdp.dom.focus(node_id=cdp.dom.NodeId(1)),
+                cdp.input_.insert_text("a"),
+                cdp.input_.dispatch_key_event("keyUp"),
+            ]
+        )
+        assert methods(server) == [
+            "DOM.focus",
+            "Input.insertText",
+            "Input.dispatchKeyEvent",
+        ]
+
+
+async def test_priority_overtakes_queued_batch(mock_target):
+    async with mock_target() as (server, connection):
+        server.received.clear()
+        # both are queued before the writer runs
+        await asyncio.gather(
+            connection.send_many(
+                [cdp.runtime.evaluate("1"), cdp.runtime.evaluate("2")]
+            ),
+            connection.send(cdp.input_.insert_text("a")),
+        )
+        assert methods(server) == [
+            "Input.insertText",
+            "Runtime.evaluate",
+            "Runtime.evaluate",
+        ]
+
+
+async def test_bulk_connection_routing(mock_target):
+    async with mock_target(bulk_connection=True) as (server, connection):
+        clients = {}
+
+        def record(method, result):
+            def respond(params, client, session_id):
+                clients[method] = client
+                return result
+
+            server.set_response(method, respond)
+
+        record("Runtime.evaluate", {"result": {"type": "undefined"}})
+        record("Page.printToPDF", {"data": ""})
+        record("Network.getResponseBody", {"body": "", "base64Encoded": False})
+        await connection.send(cdp.runtime.evaluate("1"))
+        await connection.send(cdp.page.print_to_pdf())
+        await connection.send(cdp.network.get_response_body(cdp.network.RequestId("1")))
+        # response bodies belong to the session, pdfs don't
+        assert clients["Network.getResponseBody"] is clients["Runtime.evaluate"]
+        assert clients["Page.printToPDF"] is not clients["Runtime.evaluate"]
+
+
+async def test_close_during_submit(mock_target):
+    async with mock_target() as (server, connection):
+
+        async def close(params, client, session_id):
+            await client.websocket.close()
+
+        # the handler makes the next send() enable the domain first,
+        # which closes the websocket
+        server.set_response("Network.enable", close)
+        connection.add_handler(cdp.network.DataReceived, lambda event: None)
+        with pytest.raises(ProtocolException):
+            await connection.send(cdp.runtime.evaluate("1"))
+        assert not connection.mapper
+
+
+async def test_listener_error_fails_pending(mock_target, monkeypatch):
+    async with mock_target() as (server, connection):
+
+        def broken(message):
+            raise RuntimeError("broken")
+
+        pending = asyncio.ensure_future(connection.send(cdp.runtime.evaluate("1")))
+        await asyncio.sleep(0)
+        monkeypatch.setattr(connection, "_receive", broken)
+        with pytest.raises(ProtocolException):
+            await pending
+
+
+async def test_disconnect_fails_pending(mock_target):
+    async with mock_target() as (server, connection):
+
+        answer = asyncio.Event()
+
+        async def later(params, client, session_id):
+            await answer.wait()
+
+        server.set_response("Runtime.evaluate", later)
+        pending = asyncio.ensure_future(connection.send(cdp.runtime.evaluate("1")))
+        await asyncio.sleep(0.05)
+        await connection.disconnect()
+        with pytest.raises(ProtocolException):
+            await pending
+        answer.set()
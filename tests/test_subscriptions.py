@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+
+from nodriver import cdp
+from nodriver.core import connection as connection_module
+from nodriver.core.connection import Connection, Subscription
+
+
+def data_received(i):
+    return {
+        "requestId": str(i),
+        "timestamp": 1.0,
+        "dataLength": 1,
+        "encodedDataLength": 1,
+    }
+
+
+async def flood(server, connection, **options):
+    """
+    sends 10 DataReceived events to a handler with a bounded queue. the handler blocks
+    on the first event until all events are received, so the queue overflows.
+
+    :return: (request ids received by the handler, the subscription)
+    """
+    target_id = next(iter(server.targets))
+    release = asyncio.Event()
+    received = []
+
+    async def handler(event):
+        received.append(event.request_id)
+        await release.wait()
+
+    sub = connection.add_handler(cdp.network.DataReceived, handler, **options)
+    await connection.send(cdp.runtime.evaluate("1"))
+    await server.emit("Network.dataReceived", data_received(0), target_id)
+    while not received:
+        await asyncio.sleep(0.01)
+    await server.storm(
+        "Network.dataReceived",
+        lambda i: data_received(i + 1),
+        rate=None,
+        count=9,
+        target_id=target_id,
+    )
+    # the response arrives after all events were handled by the listener
+    await connection.send(cdp.runtime.evaluate("1"))
+    release.set()
+    while sub.stats["queued"]:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+    return received, sub
+
+
+async def test_drop_oldest(mock_target):
+    async with mock_target() as (server, connection):
+        received, sub = await flood(server, connection, maxsize=2, policy="drop_oldest")
+        assert received == ["0", "8", "9"]
+        assert sub.stats["received"] == 10
+        assert sub.stats["dropped"] == 7
+
+
+async def test_drop_newest(mock_target):
+    async with mock_target() as (server, connection):
+        received, sub = await flood(server, connection, maxsize=2, policy="drop_newest")
+        assert received == ["0", "1", "2"]
+        assert sub.stats["dropped"] == 7
+
+
+async def test_coalesce(mock_target):
+    async with mock_target() as (server, connection):
+        received, sub = await flood(
+            server,
+            connection,
+            maxsize=10,
+            policy="coalesce",
+            key=lambda params: int(params["requestId"]) % 2,
+        )
+        # the latest event per key was kept, in the place of the first one
+        assert received == ["0", "9", "8"]
+        assert sub.stats["coalesced"] == 7
+
+
+async def test_block_backlog_is_bounded(mock_target, monkeypatch):
+    monkeypatch.setattr(connection_module, "BLOCK_BACKLOG", 5)
+    async with mock_target() as (server, connection):
+        target_id = next(iter(server.targets))
+        received = []
+        waiting = []
+
+        async def slow(event):
+            received.append(event.request_id)
+            waiting.append(sub.stats["waiting"])
+            await asyncio.sleep(0.001)
+
+        sub = connection.add_handler(
+            cdp.network.DataReceived, slow, maxsize=2, policy="block"
+        )
+        await connection.send(cdp.runtime.evaluate("1"))
+        await server.storm(
+            "Network.dataReceived",
+            data_received,
+            rate=None,
+            count=200,
+            target_id=target_id,
+        )
+        while len(received) < 200:
+            await asyncio.sleep(0.01)
+        # the listener stopped reading instead of buffering the storm
+        assert received == [str(i) for i in range(200)]
+        assert max(waiting) <= 5
+        assert sub.stats["dropped"] == 0
+
+
+async def test_events_iterator(mock_target):
+    async with mock_target() as (server, connection):
+        target_id = next(iter(server.targets))
+        events = connection.events(cdp.network.DataReceived, where={"requestId": "3"})
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.05)
+        await server.storm(
+            "Network.dataReceived",
+            data_received,
+            rate=None,
+            count=5,
+            target_id=target_id,
+        )
+        event = await pending
+        assert event.request_id == "3"
+        await events.aclose()
+        assert not connection.handlers
+
+
+async def test_block_keeps_all_events(mock_target):
+    async with mock_target() as (server, connection):
+        received, sub = await flood(server, connection, maxsize=2, policy="block")
+        assert received == [str(i) for i in range(10)]
+        assert sub.stats["dropped"] == 0
+        assert sub.stats["waiting"] == 0
+
+
+async def test_block_handler_can_send(mock_target):
+    async with mock_target() as (server, connection):
+        target_id = next(iter(server.targets))
+        results = []
+
+        async def handler(event):
+            # the responses are read while the queue of this handler is full
+            results.append(await connection.send(cdp.runtime.evaluate("1")))
+
+        sub = connection.add_handler(
+            cdp.network.DataReceived, handler, maxsize=1, policy="block"
+        )
+        await connection.send(cdp.runtime.evaluate("1"))
+        await server.storm(
+            "Network.dataReceived",
+            data_received,
+            rate=None,
+            count=20,
+            target_id=target_id,
+        )
+        while len(results) < 20:
+            await asyncio.sleep(0.01)
+        assert sub.stats["delivered"] == 20
+
+
+async def test_events_requires_maxsize(mock_target):
+    async with mock_target() as (server, connection):
+        for maxsize in (None, 0):
+            with pytest.raises(ValueError):
+                await connection.events(
+                    cdp.network.DataReceived, maxsize=maxsize
+                ).__anext__()
+        assert not connection.handlers
+
+
+def test_where_matches_enums():
+    sub = Subscription(lambda event: None, where={"type": cdp.network.ResourceType.XHR})
+    assert sub.matches({"type": "XHR"})
+    assert not sub.matches({"type": "Document"})
+
+
+def test_remove_subscription_keeps_plain_handler():
+    connection = Connection(None)
+
+    def handler(event):
+        pass
+
+    connection.add_handler(cdp.network.DataReceived, handler)
+    sub = connection.add_handler(cdp.network.DataReceived, handler, maxsize=1)
+    connection.add_handler(cdp.network.DataReceived, handler)
+    connection.remove_handler(cdp.network.DataReceived, sub)
+    assert connection.handlers[cdp.network.DataReceived] == [handler, handler]
+    assert all(cb is handler for cb in connection.handlers[cdp.network.DataReceived])
+    # a function removes its subscriptions as well
+    sub = connection.add_handler(cdp.network.DataReceived, handler, maxsize=1)
+    connection.remove_handler(cdp.network.DataReceived, handler)
+    assert not connection.handlers
@@ -0,0 +1,14 @@
+import base64
+
+import pytest
+
+from nodriver.core import util
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 5, 8, 2**20])
+def test_write_base64(tmp_path, chunk_size):
+    data = bytes(range(256)) * 3
+    path = tmp_path / "out.bin"
+    written = util.write_base64(path, base64.b64encode(data).decode(), chunk_size)
+    assert written == len(data)
+    assert path.read_bytes() == data